@@ -0,0 +1,339 @@
+"""Offline benchmarks for the backend hot paths on synthetic landmark data.
+
+Everything runs inside a temporary working directory, so the SQLite database
+and model artifacts the benchmarks create never touch the real storage/.
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import numpy as np
+
+SEED = 1234
+NUM_SIGNS = 10
+
+
+def synthetic_landmark_sets(num_samples: int, num_signs: int = NUM_SIGNS, seed: int = SEED):
+    """Noisy copies of one random base pose per sign, mixing one- and two-hand samples."""
+    rng = np.random.default_rng(seed)
+    bases = rng.random((num_signs, 42, 3))
+    signs = rng.integers(0, num_signs, num_samples)
+    two_hands = rng.random(num_samples) < 0.5
+
+    landmark_sets = []
+    for sign, both in zip(signs, two_hands):
+        points = bases[sign, :42 if both else 21] + rng.normal(0, 0.02, (42 if both else 21, 3))
+        landmark_sets.append(points.tolist())
+    return landmark_sets, [f"sign_{sign}" for sign in signs]
+
+
+def latency_stats(samples_ms) -> dict:
+    samples_ms = np.asarray(samples_ms)
+    return {
+        "iterations": int(len(samples_ms)),
+        "mean_ms": float(samples_ms.mean()),
+        "p50_ms": float(np.percentile(samples_ms, 50)),
+        "p99_ms": float(np.percentile(samples_ms, 99)),
+    }
+
+
+def time_calls(fn, iterations: int, warmup: int = 5) -> dict:
+    for _ in range(warmup):
+        fn()
+
+    samples_ms = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples_ms.append((time.perf_counter() - start) * 1000)
+    return latency_stats(samples_ms)
+
+
+def bench_preprocessing(num_samples: int):
+    from models.model import SignRecognitionModel
+    from models.preprocessing import preprocess_landmark_sets
+
+    landmark_sets, _ = synthetic_landmark_sets(num_samples)
+    model = SignRecognitionModel(NUM_SIGNS)
+
+    start = time.perf_counter()
+    for landmarks in landmark_sets:
+        model.preprocess_landmarks(landmarks)
+    per_sample = time.perf_counter() - start
+
+    start = time.perf_counter()
+    preprocess_landmark_sets(landmark_sets)
+    batch = time.perf_counter() - start
+
+    return {
+        "samples": num_samples,
+        "per_sample_seconds": per_sample,
+        "batch_seconds": batch,
+        "per_sample_throughput": num_samples / per_sample,
+        "batch_throughput": num_samples / batch,
+        "speedup": per_sample / batch,
+    }
+
+
+def bench_augmentation(num_samples: int):
+    from models.augmentation import AugmentedSequence
+    from models.preprocessing import preprocess_landmark_sets
+
+    landmark_sets, signs = synthetic_landmark_sets(num_samples)
+    X = preprocess_landmark_sets(landmark_sets)
+    y = np.eye(NUM_SIGNS, dtype=np.float32)[[int(sign.split("_")[1]) for sign in signs]]
+    sequence = AugmentedSequence(X, y, seed=SEED)
+
+    start = time.perf_counter()
+    for index in range(len(sequence)):
+        sequence[index]
+    seconds = time.perf_counter() - start
+
+    return {
+        "samples": num_samples,
+        "augmented_samples": sequence.num_samples,
+        "seconds_per_epoch": seconds,
+        "throughput": sequence.num_samples / seconds,
+    }
+
+
+def bench_ingestion(db, model, num_samples: int, batch_size: int):
+    from database.samples import insert_training_samples
+
+    landmark_sets, signs = synthetic_landmark_sets(num_samples)
+    samples = list(zip(signs, landmark_sets))
+
+    start = time.perf_counter()
+    for offset in range(0, num_samples, batch_size):
+        insert_training_samples(db, model, samples[offset:offset + batch_size])
+    seconds = time.perf_counter() - start
+
+    return {
+        "samples": num_samples,
+        "batch_size": batch_size,
+        "seconds": seconds,
+        "throughput": num_samples / seconds,
+    }
+
+
+def bench_training(model_id: str, num_samples: int, epochs: int):
+    from models.training import ModelTrainer
+    from models.preprocessing import pack_landmark_sets
+
+    landmark_sets, signs = synthetic_landmark_sets(num_samples)
+    points, counts = pack_landmark_sets(landmark_sets)
+
+    trainer = ModelTrainer(model_id)
+    trainer.add_samples(points, counts, signs)
+
+    start = time.perf_counter()
+    history = trainer.train_model(epochs=epochs)
+    seconds = time.perf_counter() - start
+
+    return {
+        "samples": num_samples,
+        "epochs": len(history.history["loss"]),
+        "seconds": seconds,
+        "seconds_per_epoch": seconds / max(len(history.history["loss"]), 1),
+        "final_val_accuracy": float(history.history.get("val_accuracy", [float("nan")])[-1]),
+    }
+
+
+def _float32_runtime(model_id: str):
+    from models.artifacts import load_variant, read_manifest
+    from models.numpy_runtime import runtime_model_from_arrays
+
+    return runtime_model_from_arrays(load_variant(model_id, read_manifest(model_id), "float32"))
+
+
+def bench_model_loading(model_id: str, iterations: int, cold_start_models: int):
+    from models.artifacts import model_dir, read_manifest
+    from models.model import SignRecognitionModel
+    from models.model_cache import current_keras_path, load_model_artifact
+    from models.numpy_runtime import NumpySignModel
+
+    legacy_path = f"storage/models/{model_id}-legacy.npz"
+    _float32_runtime(model_id).save(legacy_path)
+    metadata = read_manifest(model_id)["metadata"]
+
+    def load_keras():
+        SignRecognitionModel(NUM_SIGNS).load(current_keras_path(model_id))
+
+    def load_numpy():
+        NumpySignModel.load(legacy_path)
+
+    def load_versioned():
+        load_model_artifact(model_id)
+
+    # Cold start over many models: copies of the same trained model, loaded
+    # through the model cache's loader from flat .npz + metadata files and
+    # from versioned directories.
+    flat_copies = [f"{model_id}-flat{i}" for i in range(cold_start_models)]
+    versioned_copies = [f"{model_id}-copy{i}" for i in range(cold_start_models)]
+    for flat_id, copy_id in zip(flat_copies, versioned_copies):
+        shutil.copyfile(legacy_path, f"storage/models/{flat_id}.npz")
+        with open(f"storage/models/{flat_id}_metadata.json", 'w') as f:
+            json.dump(metadata, f)
+        shutil.copytree(model_dir(model_id), model_dir(copy_id))
+
+    start = time.perf_counter()
+    for flat_id in flat_copies:
+        load_model_artifact(flat_id)
+    flat_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for copy_id in versioned_copies:
+        load_model_artifact(copy_id)
+    versioned_seconds = time.perf_counter() - start
+
+    return {
+        "keras_h5": time_calls(load_keras, iterations, warmup=1),
+        "numpy_npz": time_calls(load_numpy, iterations, warmup=1),
+        "versioned_artifact": time_calls(load_versioned, iterations, warmup=1),
+        "cold_start": {
+            "models": cold_start_models,
+            "flat_npz_seconds": flat_seconds,
+            "versioned_seconds": versioned_seconds,
+        },
+    }
+
+
+def bench_preload(model_id: str, num_models: int):
+    """Startup preload of copies of one trained model, one at a time and on
+    the preload pool. The cache is emptied before each run."""
+    from models.artifacts import model_dir
+    from models.model_cache import model_cache
+    from models.preload import PRELOAD_WORKERS, preload_models
+
+    num_models = min(num_models, model_cache.max_models)
+    copies = [f"{model_id}-preload{i}" for i in range(num_models)]
+    for copy_id in copies:
+        shutil.copytree(model_dir(model_id), model_dir(copy_id))
+
+    results = {"models": num_models}
+    for name, workers in (("sequential", 1), ("pool", PRELOAD_WORKERS)):
+        model_cache.clear()
+        start = time.perf_counter()
+        preload_models(copies, workers=workers, log=lambda message: None)
+        results[f"{name}_seconds"] = time.perf_counter() - start
+    results["workers"] = PRELOAD_WORKERS
+    results["speedup"] = results["sequential_seconds"] / results["pool_seconds"]
+    model_cache.clear()
+    return results
+
+
+def bench_prediction(model_id: str, iterations: int, batch_size: int):
+    from models.model import SignRecognitionModel
+    from models.model_cache import current_keras_path
+    from routes.detection import predict_sign, PredictionRequest
+
+    landmark_sets, _ = synthetic_landmark_sets(batch_size)
+    numpy_model = _float32_runtime(model_id)
+    keras_model = SignRecognitionModel(NUM_SIGNS)
+    keras_model.load(current_keras_path(model_id))
+
+    single = numpy_model.preprocess_landmarks(landmark_sets[0])[np.newaxis]
+    batch = np.stack([numpy_model.preprocess_landmarks(landmarks) for landmarks in landmark_sets])
+    request = PredictionRequest(landmarks=landmark_sets[0])
+
+    return {
+        "batch_size": batch_size,
+        "numpy_single": time_calls(lambda: numpy_model.predict(single), iterations),
+        "numpy_batch": time_calls(lambda: numpy_model.predict(batch), iterations),
+        "keras_single": time_calls(lambda: keras_model.predict(single), iterations),
+        "keras_batch": time_calls(lambda: keras_model.predict(batch), iterations),
+        "predict_route": time_calls(lambda: predict_sign(model_id, request), iterations),
+    }
+
+
+def environment_info() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    info = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "seed": SEED,
+    }
+    try:
+        import tensorflow as tf
+        info["tensorflow"] = tf.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def run_benchmarks(quick: bool = False, log=print) -> dict:
+    sizes = [500] if quick else [1000, 5000]
+    epochs = 3 if quick else 10
+    iterations = 50 if quick else 500
+    preprocess_samples = 2000 if quick else 20000
+
+    results = {}
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="sign-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            from database.database import init_db, SessionLocal
+            from database.models import Model
+            from database.registry import model_registry
+
+            init_db()
+            db = SessionLocal()
+            try:
+                log("Benchmarking preprocessing")
+                results["preprocessing"] = bench_preprocessing(preprocess_samples)
+
+                log("Benchmarking augmentation")
+                results["augmentation"] = bench_augmentation(preprocess_samples)
+
+                model = Model(
+                    name="benchmark", type="standard",
+                    signs=json.dumps([f"sign_{i}" for i in range(NUM_SIGNS)])
+                )
+                db.add(model)
+                db.commit()
+
+                log("Benchmarking sample ingestion")
+                results["ingestion"] = {
+                    "single": bench_ingestion(db, model, 200 if quick else 1000, 1),
+                    "bulk": bench_ingestion(db, model, preprocess_samples, 1000),
+                }
+
+                results["training"] = []
+                for size in sizes:
+                    log(f"Benchmarking training on {size} samples")
+                    results["training"].append(bench_training(model.id, size, epochs))
+
+                model.is_trained = True
+                db.commit()
+                model_registry.set(model.id, True)
+
+                log("Benchmarking model loading")
+                results["model_loading"] = bench_model_loading(
+                    model.id, 5 if quick else 20, 50 if quick else 300
+                )
+
+                log("Benchmarking preload")
+                results["preload"] = bench_preload(model.id, 32 if quick else 64)
+
+                log("Benchmarking prediction")
+                results["prediction"] = bench_prediction(model.id, iterations, 64)
+            finally:
+                db.close()
+        finally:
+            os.chdir(original_cwd)
+
+    return {"environment": environment_info(), "quick": quick, "results": results}
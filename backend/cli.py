@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+import tarfile
+
+def ingest(args):
+    from database.database import init_db, SessionLocal
+    from database.models import Model
+    from utils.dataset_ingest import run_ingest
+
+    init_db()
+    db = SessionLocal()
+    try:
+        model = db.query(Model).filter(Model.id == args.model_id).first()
+        if model is None:
+            print(f"Model not found: {args.model_id}")
+            return 1
+
+        manifest = args.manifest or os.path.join(args.root, f".ingest-{args.model_id}.jsonl")
+        stats = run_ingest(
+            db, model, args.root, manifest,
+            workers=args.workers,
+            frame_step=args.frame_step,
+            segment_frames=args.segment_frames,
+            batch_size=args.batch_size
+        )
+        print(
+            f"Done: {stats['samples']} samples from {stats['frames']} frames "
+            f"in {stats['seconds']:.1f}s"
+        )
+        return 0
+    finally:
+        db.close()
+
+def export_dataset(args):
+    from database.database import init_db, SessionLocal
+    from database.models import Model
+    from utils.dataset_archive import export_dataset as write_archive, SHARD_SAMPLES
+
+    init_db()
+    db = SessionLocal()
+    try:
+        model = db.query(Model).filter(Model.id == args.model_id).first()
+        if model is None:
+            print(f"Model not found: {args.model_id}", file=sys.stderr)
+            return 1
+
+        output = sys.stdout.buffer if args.output == "-" else open(args.output, 'wb')
+        written = 0
+        try:
+            for chunk in write_archive(db, model, shard_samples=args.shard_samples or SHARD_SAMPLES):
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        print(f"Exported {written / 1e6:.1f} MB", file=sys.stderr)
+        return 0
+    finally:
+        db.close()
+
+def import_dataset(args):
+    from database.database import init_db, SessionLocal
+    from database.models import Model
+    from utils.dataset_archive import import_dataset as read_archive, read_archive_manifest
+    from jobs.scheduler import training_scheduler
+
+    init_db()
+    db = SessionLocal()
+    created = False
+    try:
+        if args.model_id:
+            model = db.query(Model).filter(Model.id == args.model_id).first()
+            if model is None:
+                print(f"Model not found: {args.model_id}")
+                return 1
+        else:
+            with open(args.archive, 'rb') as f:
+                definition = read_archive_manifest(f)["model"]
+            model = Model(
+                name=definition["name"],
+                type=definition["type"],
+                signs=json.dumps(definition["signs"]),
+                input_pipeline=definition["input_pipeline"],
+                backend=definition["backend"],
+                is_trained=False,
+                training_progress=0
+            )
+            db.add(model)
+            db.commit()
+            created = True
+            print(f"Created model {model.id}")
+
+        try:
+            with open(args.archive, 'rb') as f:
+                stats = read_archive(db, model, f, owner=training_scheduler.instance_id)
+        except (ValueError, tarfile.TarError) as e:
+            # Nothing was imported; do not leave the new model behind empty.
+            if created:
+                db.delete(model)
+                db.commit()
+            print(f"Invalid dataset archive: {e}")
+            return 1
+        for sign in stats["skipped_signs"]:
+            print(f"Skipped samples of '{sign}': not a sign of this model")
+        print(
+            f"Done: {stats['samples']} samples from {stats['shards']} shards "
+            f"in {stats['seconds']:.1f}s ({stats['skipped']} skipped)"
+        )
+        return 0
+    finally:
+        db.close()
+
+def benchmark(args):
+    from benchmarks.suite import run_benchmarks
+
+    report = run_benchmarks(quick=args.quick)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results written to {args.output}")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sign Recognition command-line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser(
+        "ingest", help="Extract landmarks from a folder of labelled videos/images into a model"
+    )
+    ingest_parser.add_argument("model_id")
+    ingest_parser.add_argument("root", help="Directory with one sub-folder per sign")
+    ingest_parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    ingest_parser.add_argument("--frame-step", type=int, default=1, help="Use every N-th video frame")
+    ingest_parser.add_argument("--segment-frames", type=int, default=900,
+                               help="Split videos into segments of this many frames (keep it fixed when resuming)")
+    ingest_parser.add_argument("--batch-size", type=int, default=2000, help="Samples per insert transaction")
+    ingest_parser.add_argument("--manifest", default=None,
+                               help="Resume manifest (default: <root>/.ingest-<model_id>.jsonl)")
+    ingest_parser.set_defaults(handler=ingest)
+
+    export_parser = commands.add_parser(
+        "export-dataset", help="Write a model's training samples to a dataset archive"
+    )
+    export_parser.add_argument("model_id")
+    export_parser.add_argument("output", help="Archive path, or - for stdout")
+    export_parser.add_argument("--shard-samples", type=int, default=None,
+                               help="Samples per NPZ shard (default: DATASET_SHARD_SAMPLES or 20000)")
+    export_parser.set_defaults(handler=export_dataset)
+
+    import_parser = commands.add_parser(
+        "import-dataset", help="Load the training samples of a dataset archive into a model"
+    )
+    import_parser.add_argument("archive")
+    import_parser.add_argument("--model-id", default=None,
+                               help="Existing model (default: create one from the archive's definition)")
+    import_parser.set_defaults(handler=import_dataset)
+
+    benchmark_parser = commands.add_parser(
+        "benchmark", help="Run the offline performance benchmarks on synthetic data"
+    )
+    benchmark_parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    benchmark_parser.add_argument("--quick", action="store_true", help="Smaller datasets and fewer iterations")
+    benchmark_parser.set_defaults(handler=benchmark)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+from sqlalchemy import inspect, text
+import json
+import numpy as np
+
+MIGRATION_CHUNK_SIZE = 5000
+
+
+def _column_names(conn, table: str):
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+def migrate_landmarks_to_blob(conn):
+    if "num_points" in _column_names(conn, "training_samples"):
+        return
+
+    conn.exec_driver_sql("""
+        CREATE TABLE training_samples_new (
+            id VARCHAR NOT NULL,
+            model_id VARCHAR NOT NULL,
+            sign VARCHAR NOT NULL,
+            landmarks BLOB NOT NULL,
+            num_points INTEGER NOT NULL,
+            created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+            PRIMARY KEY (id),
+            FOREIGN KEY(model_id) REFERENCES models (id)
+        )
+    """)
+
+    insert = text("""
+        INSERT INTO training_samples_new (id, model_id, sign, landmarks, num_points, created_at)
+        VALUES (:id, :model_id, :sign, :landmarks, :num_points, :created_at)
+    """)
+
+    rows = conn.exec_driver_sql(
+        "SELECT id, model_id, sign, landmarks, created_at FROM training_samples"
+    )
+    while True:
+        chunk = rows.fetchmany(MIGRATION_CHUNK_SIZE)
+        if not chunk:
+            break
+
+        converted = []
+        for sample_id, model_id, sign, landmarks, created_at in chunk:
+            points = np.asarray(json.loads(landmarks), dtype="<f4").reshape(-1, 3)
+            converted.append({
+                "id": sample_id,
+                "model_id": model_id,
+                "sign": sign,
+                "landmarks": points.tobytes(),
+                "num_points": len(points),
+                "created_at": created_at,
+            })
+        conn.execute(insert, converted)
+
+    conn.exec_driver_sql("DROP TABLE training_samples")
+    conn.exec_driver_sql("ALTER TABLE training_samples_new RENAME TO training_samples")
+
+
+def add_sample_index_and_sign_counts(conn):
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_training_samples_model_id ON training_samples (model_id)"
+    )
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS sign_sample_counts (
+            model_id VARCHAR NOT NULL,
+            sign VARCHAR NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (model_id, sign),
+            FOREIGN KEY(model_id) REFERENCES models (id)
+        )
+    """)
+    conn.exec_driver_sql("DELETE FROM sign_sample_counts")
+    conn.exec_driver_sql("""
+        INSERT INTO sign_sample_counts (model_id, sign, count)
+        SELECT model_id, sign, COUNT(*) FROM training_samples GROUP BY model_id, sign
+    """)
+
+
+def add_sample_sequence(conn):
+    if "seq" not in _column_names(conn, "training_samples"):
+        conn.exec_driver_sql("ALTER TABLE training_samples ADD COLUMN seq INTEGER")
+    if "sample_seq" not in _column_names(conn, "models"):
+        conn.exec_driver_sql("ALTER TABLE models ADD COLUMN sample_seq INTEGER DEFAULT 0")
+    if inspect(conn).has_table("training_jobs") and "mode" not in _column_names(conn, "training_jobs"):
+        conn.exec_driver_sql("ALTER TABLE training_jobs ADD COLUMN mode VARCHAR NOT NULL DEFAULT 'full'")
+
+    rows = conn.exec_driver_sql(
+        "SELECT rowid, model_id FROM training_samples ORDER BY model_id, created_at, rowid"
+    ).fetchall()
+
+    update = text("UPDATE training_samples SET seq = :seq WHERE rowid = :rowid")
+    sequence = {}
+    updates = []
+    for rowid, model_id in rows:
+        sequence[model_id] = sequence.get(model_id, 0) + 1
+        updates.append({"seq": sequence[model_id], "rowid": rowid})
+        if len(updates) >= MIGRATION_CHUNK_SIZE:
+            conn.execute(update, updates)
+            updates = []
+    if updates:
+        conn.execute(update, updates)
+
+    conn.exec_driver_sql("""
+        UPDATE models SET sample_seq = (
+            SELECT COALESCE(MAX(seq), 0) FROM training_samples
+            WHERE training_samples.model_id = models.id
+        )
+    """)
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_training_samples_model_seq ON training_samples (model_id, seq)"
+    )
+
+
+def add_dataset_version(conn):
+    if "dataset_version" not in _column_names(conn, "models"):
+        conn.exec_driver_sql("ALTER TABLE models ADD COLUMN dataset_version INTEGER DEFAULT 0")
+
+
+def add_input_pipeline(conn):
+    if "input_pipeline" not in _column_names(conn, "models"):
+        conn.exec_driver_sql("ALTER TABLE models ADD COLUMN input_pipeline VARCHAR NOT NULL DEFAULT 'landmarks'")
+
+
+def add_model_backend(conn):
+    if "backend" not in _column_names(conn, "models"):
+        conn.exec_driver_sql("ALTER TABLE models ADD COLUMN backend VARCHAR NOT NULL DEFAULT 'mlp'")
+
+
+def add_training_job_owner(conn):
+    if not inspect(conn).has_table("training_jobs"):
+        return
+    columns = _column_names(conn, "training_jobs")
+    if "owner" not in columns:
+        conn.exec_driver_sql("ALTER TABLE training_jobs ADD COLUMN owner VARCHAR")
+    if "heartbeat_at" not in columns:
+        conn.exec_driver_sql("ALTER TABLE training_jobs ADD COLUMN heartbeat_at DATETIME")
+
+
+def add_sample_import_id(conn):
+    if "import_id" not in _column_names(conn, "training_samples"):
+        conn.exec_driver_sql("ALTER TABLE training_samples ADD COLUMN import_id VARCHAR")
+
+
+MIGRATIONS = [
+    migrate_landmarks_to_blob,
+    add_sample_index_and_sign_counts,
+    add_sample_sequence,
+    add_dataset_version,
+    add_input_pipeline,
+    add_model_backend,
+    add_training_job_owner,
+    add_sample_import_id,
+]
+
+
+def run_migrations(engine):
+    with engine.begin() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+        # Fresh databases get the current schema from create_all.
+        if not inspect(conn).has_table("training_samples"):
+            version = len(MIGRATIONS)
+
+        for index in range(version, len(MIGRATIONS)):
+            print(f"Applying database migration {index + 1}: {MIGRATIONS[index].__name__}")
+            MIGRATIONS[index](conn)
+
+        conn.exec_driver_sql(f"PRAGMA user_version = {len(MIGRATIONS)}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, Text, ForeignKey
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, Text, LargeBinary, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -14,16 +14,72 @@ class Model(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_trained = Column(Boolean, default=False)
     training_progress = Column(Integer, default=0)
+    sample_seq = Column(Integer, default=0)
+    dataset_version = Column(Integer, default=0)
+    input_pipeline = Column(String, nullable=False, default="landmarks")
+    backend = Column(String, nullable=False, default="mlp")
     
     training_samples = relationship("TrainingSample", back_populates="model", cascade="all, delete-orphan")
+    sign_counts = relationship("SignSampleCount", cascade="all, delete-orphan")
+    training_jobs = relationship("TrainingJob", cascade="all, delete-orphan")
+    dataset_imports = relationship("DatasetImport", cascade="all, delete-orphan")
 
 class TrainingSample(Base):
     __tablename__ = "training_samples"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    model_id = Column(String, ForeignKey("models.id"), nullable=False)
+    model_id = Column(String, ForeignKey("models.id"), nullable=False, index=True)
     sign = Column(String, nullable=False)
-    landmarks = Column(Text, nullable=False)
+    landmarks = Column(LargeBinary, nullable=False)
+    num_points = Column(Integer, nullable=False)
+    seq = Column(Integer)
+    # Set on rows written by an archive import, so a failed one can be removed.
+    import_id = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    model = relationship("Model", back_populates="training_samples")
\ No newline at end of file
+    model = relationship("Model", back_populates="training_samples")
+    
+    __table_args__ = (
+        Index("ix_training_samples_model_seq", "model_id", "seq"),
+    )
+
+class SignSampleCount(Base):
+    __tablename__ = "sign_sample_counts"
+    
+    model_id = Column(String, ForeignKey("models.id"), primary_key=True)
+    sign = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class TrainingJob(Base):
+    __tablename__ = "training_jobs"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    model_id = Column(String, ForeignKey("models.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="queued")
+    mode = Column(String, nullable=False, default="full")
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    # API process that queued the job and keeps its heartbeat fresh.
+    owner = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        Index(
+            "ix_training_jobs_active_model", "model_id", unique=True,
+            sqlite_where=status.in_(["queued", "running"])
+        ),
+    )
+class DatasetImport(Base):
+    """An archive import in progress. Samples from first_seq on stay out of
+    training and exports until it is published or discarded."""
+    __tablename__ = "dataset_imports"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    model_id = Column(String, ForeignKey("models.id"), nullable=False, index=True)
+    first_seq = Column(Integer, nullable=False)
+    owner = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from .database import SessionLocal
+from .models import Model
+import os
+import threading
+import time
+
+# How long "unknown" and "not trained" answers are trusted before the database
+# is asked again, so repeated predicts for such ids stay off the database.
+REGISTRY_NEGATIVE_TTL_SECONDS = float(os.environ.get("REGISTRY_NEGATIVE_TTL_SECONDS", "2"))
+REGISTRY_NEGATIVE_MAX_ENTRIES = 10000
+
+
+class ModelRegistry:
+    """In-process mirror of which models exist and whether they are trained.
+
+    The predict routes consult it instead of the database. Entries are kept up
+    to date by the create, delete and training paths of this process; a miss or
+    an untrained entry is re-checked against the database at most once per
+    REGISTRY_NEGATIVE_TTL_SECONDS, so models created or trained through another
+    API process are picked up shortly after.
+    """
+
+    def __init__(self, session_factory=SessionLocal, negative_ttl: float = REGISTRY_NEGATIVE_TTL_SECONDS):
+        self.session_factory = session_factory
+        self.negative_ttl = negative_ttl
+        self._trained = {}
+        # Model id -> monotonic time its unknown/untrained state was last
+        # checked, oldest first.
+        self._checked = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _mark_checked(self, model_id: str):
+        self._checked.pop(model_id, None)
+        self._checked[model_id] = time.monotonic()
+        # A burst of unknown ids must not grow this without bound; dropping the
+        # oldest check only means that id is looked up in the database again.
+        while len(self._checked) > REGISTRY_NEGATIVE_MAX_ENTRIES:
+            self._checked.popitem(last=False)
+
+    def load(self):
+        db = self.session_factory()
+        try:
+            rows = db.query(Model.id, Model.is_trained).all()
+        finally:
+            db.close()
+
+        with self._lock:
+            self._trained = {model_id: bool(is_trained) for model_id, is_trained in rows}
+            self._checked = OrderedDict()
+
+    def set(self, model_id: str, is_trained: bool):
+        with self._lock:
+            self._trained[model_id] = is_trained
+            if is_trained:
+                self._checked.pop(model_id, None)
+            else:
+                self._mark_checked(model_id)
+
+    def remove(self, model_id: str):
+        with self._lock:
+            self._trained.pop(model_id, None)
+            self._mark_checked(model_id)
+
+    def refresh(self, model_id: str):
+        db = self.session_factory()
+        try:
+            row = db.query(Model.is_trained).filter(Model.id == model_id).first()
+        finally:
+            db.close()
+
+        with self._lock:
+            if row is None:
+                self._trained.pop(model_id, None)
+                self._mark_checked(model_id)
+                return None
+            self._trained[model_id] = bool(row.is_trained)
+            if row.is_trained:
+                self._checked.pop(model_id, None)
+            else:
+                self._mark_checked(model_id)
+            return self._trained[model_id]
+
+    def trained_ids(self):
+        with self._lock:
+            return [model_id for model_id, is_trained in self._trained.items() if is_trained]
+
+    def status(self, model_id: str):
+        """Return True/False for trained/untrained models and None for unknown ones."""
+        is_trained = self._trained.get(model_id)
+        if is_trained:
+            return True
+        checked = self._checked.get(model_id)
+        if checked is not None and time.monotonic() - checked < self.negative_ttl:
+            return is_trained
+        return self.refresh(model_id)
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,262 @@
+from sqlalchemy import select, func, insert, update, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from collections import Counter
+from .models import Model, TrainingSample, SignSampleCount, DatasetImport
+from utils.metrics import metrics
+import json
+import numpy as np
+import uuid
+
+SAMPLE_CHUNK_SIZE = 5000
+
+samples_ingested = metrics.counter("sign_training_samples_ingested", "Training samples inserted")
+
+
+def encode_landmarks(landmarks):
+    points = np.asarray(landmarks, dtype="<f4")
+    if points.size == 0:
+        # An empty sample was always accepted and stored; it is skipped at training.
+        points = points.reshape(0, 3)
+    if points.ndim != 2 or points.shape[1] != 3:
+        raise ValueError("Landmarks must be a list of [x, y, z] points")
+    return points.tobytes(), len(points)
+
+
+def decode_landmarks(blob: bytes, num_points: int):
+    if len(blob) != num_points * 12:
+        raise ValueError("Landmark blob size does not match its point count")
+    return np.frombuffer(blob, dtype="<f4").reshape(num_points, 3)
+
+
+def _decode_rows(rows, points, counts, signs, point_offset: int, seqs=None):
+    chunk_counts = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    chunk_points = int(chunk_counts.sum())
+
+    buffer = b"".join(row[2] for row in rows)
+    if len(buffer) != chunk_points * 12:
+        raise ValueError("Corrupt landmark data in training samples")
+
+    points[point_offset:point_offset + chunk_points] = np.frombuffer(buffer, dtype="<f4").reshape(-1, 3)
+    counts[len(signs):len(signs) + len(rows)] = chunk_counts
+    if seqs is not None:
+        seqs[len(signs):len(signs) + len(rows)] = [row[3] for row in rows]
+    signs.extend(row[0] for row in rows)
+    return point_offset + chunk_points
+
+
+def load_training_samples(db: Session, model_id: str, where=None, chunk_size: int = SAMPLE_CHUNK_SIZE,
+                          return_seq: bool = False):
+    criteria = [TrainingSample.model_id == model_id]
+    if where is not None:
+        criteria.append(where)
+
+    total_samples, total_points = db.query(
+        func.count(TrainingSample.id),
+        func.coalesce(func.sum(TrainingSample.num_points), 0)
+    ).filter(*criteria).one()
+
+    points = np.empty((total_points, 3), dtype=np.float32)
+    counts = np.empty(total_samples, dtype=np.int64)
+    seqs = np.empty(total_samples, dtype=np.int64) if return_seq else None
+    signs = []
+
+    columns = [TrainingSample.sign, TrainingSample.num_points, TrainingSample.landmarks]
+    if return_seq:
+        columns.append(TrainingSample.seq)
+
+    result = db.execute(
+        select(*columns)
+        .where(*criteria)
+        .limit(total_samples)
+        .execution_options(yield_per=chunk_size)
+    )
+
+    point_offset = 0
+    for rows in result.partitions():
+        if point_offset + sum(row[1] for row in rows) > total_points:
+            break
+        point_offset = _decode_rows(rows, points, counts, signs, point_offset, seqs)
+
+    if return_seq:
+        return points[:point_offset], counts[:len(signs)], signs, seqs[:len(signs)]
+    return points[:point_offset], counts[:len(signs)], signs
+
+
+def current_sample_seq(db: Session, model_id: str) -> int:
+    return int(db.query(Model.sample_seq).filter(Model.id == model_id).scalar() or 0)
+
+
+def dataset_state(db: Session, model_id: str):
+    """(last visible sequence number, dataset version) of a model. Samples of
+    imports still in progress, and any written after they began, are past it."""
+    sample_seq, dataset_version = db.query(Model.sample_seq, Model.dataset_version).filter(
+        Model.id == model_id
+    ).one()
+    pending_seq = db.query(func.min(DatasetImport.first_seq)).filter(
+        DatasetImport.model_id == model_id
+    ).scalar()
+    last_seq = int(sample_seq or 0)
+    if pending_seq is not None:
+        last_seq = min(last_seq, pending_seq - 1)
+    return last_seq, int(dataset_version or 0)
+
+
+def count_samples_up_to(db: Session, model_id: str, seq: int) -> int:
+    return db.query(func.count(TrainingSample.id)).filter(
+        TrainingSample.model_id == model_id, TrainingSample.seq <= seq
+    ).scalar()
+
+
+def count_training_samples(db: Session, model_id: str) -> int:
+    total = db.query(func.sum(SignSampleCount.count)).filter(SignSampleCount.model_id == model_id).scalar()
+    return int(total or 0)
+
+
+def training_progress(model, total_samples: int) -> int:
+    required_samples = len(json.loads(model.signs)) * 10
+    return min(int((total_samples / required_samples) * 100), 100)
+
+
+def iter_training_samples(db: Session, model_id: str, max_seq: int = None, chunk_size: int = SAMPLE_CHUNK_SIZE):
+    """Yield (points, counts, signs) per chunk of samples in insertion order, so
+    a dataset of any size can be streamed without loading it whole."""
+    criteria = [TrainingSample.model_id == model_id]
+    if max_seq is not None:
+        criteria.append(TrainingSample.seq <= max_seq)
+
+    result = db.execute(
+        select(TrainingSample.sign, TrainingSample.num_points, TrainingSample.landmarks)
+        .where(*criteria)
+        .order_by(TrainingSample.seq)
+        .execution_options(yield_per=chunk_size)
+    )
+    for rows in result.partitions():
+        counts = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+        buffer = b"".join(row[2] for row in rows)
+        if len(buffer) != int(counts.sum()) * 12:
+            raise ValueError("Corrupt landmark data in training samples")
+        yield np.frombuffer(buffer, dtype="<f4").reshape(-1, 3), counts, [row[0] for row in rows]
+
+
+def insert_training_samples(db: Session, model, samples):
+    return insert_encoded_samples(
+        db, model, ((sign, *encode_landmarks(landmarks)) for sign, landmarks in samples)
+    )
+
+
+def _insert_rows(db: Session, model_id: str, samples, import_id: str = None):
+    """Insert (sign, landmark blob, num_points) rows with fresh sequence
+    numbers, without committing. Returns the per-sign counts."""
+    rows = []
+    sign_counts = Counter()
+    
+    for sign, blob, num_points in samples:
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "model_id": model_id,
+            "sign": sign,
+            "landmarks": blob,
+            "num_points": num_points,
+            "import_id": import_id,
+        })
+        sign_counts[sign] += 1
+    
+    if rows:
+        # Bumping the counter first takes SQLite's write lock, so concurrent
+        # ingestions get disjoint sequence ranges.
+        db.execute(
+            update(Model)
+            .where(Model.id == model_id)
+            .values(sample_seq=func.coalesce(Model.sample_seq, 0) + len(rows))
+        )
+        first_seq = current_sample_seq(db, model_id) - len(rows) + 1
+        for offset, row in enumerate(rows):
+            row["seq"] = first_seq + offset
+        
+        db.execute(insert(TrainingSample), rows)
+    return sign_counts
+
+
+def _add_sign_counts(db: Session, model, sign_counts):
+    if sign_counts:
+        upsert = sqlite_insert(SignSampleCount).values([
+            {"model_id": model.id, "sign": sign, "count": count}
+            for sign, count in sign_counts.items()
+        ])
+        db.execute(upsert.on_conflict_do_update(
+            index_elements=[SignSampleCount.model_id, SignSampleCount.sign],
+            set_={"count": SignSampleCount.count + upsert.excluded.count}
+        ))
+        db.execute(
+            update(Model)
+            .where(Model.id == model.id)
+            .values(dataset_version=func.coalesce(Model.dataset_version, 0) + 1)
+        )
+    model.training_progress = training_progress(model, count_training_samples(db, model.id))
+
+
+def insert_encoded_samples(db: Session, model, samples):
+    """Insert (sign, landmark blob, num_points) rows in one transaction."""
+    sign_counts = _insert_rows(db, model.id, samples)
+    _add_sign_counts(db, model, sign_counts)
+    db.commit()
+    
+    inserted = sum(sign_counts.values())
+    samples_ingested.inc(inserted)
+    return inserted, model.training_progress
+
+
+def begin_import(db: Session, model, owner: str = None) -> str:
+    """Open an archive import. Until it is published, samples from the
+    current sequence number on are left out of dataset_state, so training and
+    exports never see part of it; samples ingested meanwhile wait with it."""
+    dataset_import = DatasetImport(
+        model_id=model.id, first_seq=current_sample_seq(db, model.id) + 1, owner=owner
+    )
+    db.add(dataset_import)
+    db.commit()
+    return dataset_import.id
+
+
+def stage_encoded_samples(db: Session, model, import_id: str, samples):
+    """Insert one shard of an import in its own short transaction."""
+    sign_counts = _insert_rows(db, model.id, samples, import_id)
+    db.query(DatasetImport).filter(DatasetImport.id == import_id).update(
+        {DatasetImport.heartbeat_at: func.now()}, synchronize_session=False
+    )
+    db.commit()
+    return sign_counts
+
+
+def publish_import(db: Session, model, import_id: str, sign_counts):
+    """Make every staged sample of an import visible at once. Only the sign
+    counts and the import's own row are written, whatever its size."""
+    _add_sign_counts(db, model, sign_counts)
+    db.query(DatasetImport).filter(DatasetImport.id == import_id).delete(synchronize_session=False)
+    db.commit()
+    samples_ingested.inc(sum(sign_counts.values()))
+
+
+def discard_import(db: Session, import_id: str, chunk_size: int = SAMPLE_CHUNK_SIZE):
+    """Delete the samples of an unfinished import, chunk by chunk so other
+    writers are not locked out, then the import itself."""
+    dataset_import = db.get(DatasetImport, import_id)
+    if dataset_import is None:
+        return
+    
+    criteria = [
+        TrainingSample.model_id == dataset_import.model_id,
+        TrainingSample.seq >= dataset_import.first_seq,
+        TrainingSample.import_id == import_id,
+    ]
+    while True:
+        ids = db.execute(select(TrainingSample.id).where(*criteria).limit(chunk_size)).scalars().all()
+        if not ids:
+            break
+        db.execute(delete(TrainingSample).where(TrainingSample.id.in_(ids)))
+        db.commit()
+    
+    # Removed last: its samples must stay hidden until they are all gone.
+    db.delete(dataset_import)
+    db.commit()
@@ -0,0 +1,253 @@
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from database.database import SessionLocal
+from database.models import TrainingJob, DatasetImport
+from database.samples import discard_import
+from .worker import init_worker, run_training_job
+from utils.metrics import metrics, DURATION_BUCKETS
+import multiprocessing
+import os
+import socket
+import threading
+import uuid
+
+TRAINING_MAX_WORKERS = int(os.environ.get("TRAINING_MAX_WORKERS", "1"))
+TRAINING_THREADS_PER_JOB = int(os.environ.get("TRAINING_THREADS_PER_JOB", "2"))
+ACTIVE_STATUSES = ("queued", "running")
+# Each API process refreshes the jobs it owns this often; jobs whose owner
+# stopped refreshing them for TRAINING_STALE_SECONDS are failed by the others.
+TRAINING_HEARTBEAT_SECONDS = float(os.environ.get("TRAINING_HEARTBEAT_SECONDS", "10"))
+TRAINING_STALE_SECONDS = float(os.environ.get("TRAINING_STALE_SECONDS", str(3 * TRAINING_HEARTBEAT_SECONDS)))
+# Dataset imports refresh their heartbeat once per shard, which can take a while.
+DATASET_IMPORT_STALE_SECONDS = float(os.environ.get("DATASET_IMPORT_STALE_SECONDS", "300"))
+
+training_job_duration = metrics.histogram(
+    "sign_training_job_duration_seconds", "Wall time of training jobs that ran",
+    ("mode", "status"), buckets=DURATION_BUCKETS
+)
+training_jobs_finished = metrics.counter(
+    "sign_training_jobs_finished", "Training jobs by final status", ("status",)
+)
+
+
+def _instance_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _owner_is_dead(owner: str, instance_id: str) -> bool:
+    """True when owner is known to be gone without waiting for its heartbeat
+    to go stale: an earlier process with this process's pid, or a process on
+    this host that no longer exists."""
+    try:
+        host, pid, token = owner.rsplit(":", 2)
+        pid = int(pid)
+    except ValueError:
+        return False
+
+    own_host, own_pid, own_token = instance_id.rsplit(":", 2)
+    if host != own_host:
+        return False
+    if pid == int(own_pid):
+        return token != own_token
+    if os.name != "posix":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+class TrainingScheduler:
+    def __init__(self, max_workers: int = TRAINING_MAX_WORKERS,
+                 threads_per_job: int = TRAINING_THREADS_PER_JOB):
+        self.max_workers = max_workers
+        self.threads_per_job = threads_per_job
+        self.executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.instance_id = _instance_id()
+        self._stop = threading.Event()
+        self._heartbeat_thread = None
+
+    def start(self):
+        self.recover()
+        self.recover_imports()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(self.threads_per_job,)
+        )
+        self._stop.clear()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, name="training-heartbeat", daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(TRAINING_HEARTBEAT_SECONDS):
+            try:
+                self.heartbeat()
+                self.recover()
+                self.recover_imports()
+            except Exception as e:
+                print(f"Training heartbeat failed: {e}")
+
+    def heartbeat(self):
+        db = SessionLocal()
+        try:
+            db.query(TrainingJob).filter(
+                TrainingJob.owner == self.instance_id,
+                TrainingJob.status.in_(ACTIVE_STATUSES)
+            ).update({TrainingJob.heartbeat_at: func.now()}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def recover(self):
+        """Fail the active jobs of API processes that are gone, so their models
+        can be trained again. Jobs of live processes are left alone."""
+        db = SessionLocal()
+        try:
+            not_own = or_(TrainingJob.owner.is_(None), TrainingJob.owner != self.instance_id)
+            candidates = db.query(TrainingJob.id, TrainingJob.owner).filter(
+                TrainingJob.status.in_(ACTIVE_STATUSES), not_own
+            ).all()
+            orphaned = [
+                job_id for job_id, owner in candidates
+                if owner is None or _owner_is_dead(owner, self.instance_id)
+            ]
+            stale_before = func.datetime("now", f"-{int(TRAINING_STALE_SECONDS)} seconds")
+
+            db.query(TrainingJob).filter(
+                TrainingJob.status.in_(ACTIVE_STATUSES),
+                not_own,
+                or_(TrainingJob.id.in_(orphaned), TrainingJob.heartbeat_at < stale_before)
+            ).update(
+                {
+                    TrainingJob.status: "failed",
+                    TrainingJob.error: "Interrupted: the server process running it stopped",
+                    TrainingJob.finished_at: func.now()
+                },
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def recover_imports(self):
+        """Discard dataset imports left unfinished by processes that are gone,
+        since they hold back every sample added after them."""
+        db = SessionLocal()
+        try:
+            stale_before = func.datetime("now", f"-{int(DATASET_IMPORT_STALE_SECONDS)} seconds")
+            candidates = db.query(
+                DatasetImport.id, DatasetImport.owner, DatasetImport.heartbeat_at < stale_before
+            ).filter(
+                or_(DatasetImport.owner.is_(None), DatasetImport.owner != self.instance_id)
+            ).all()
+            for import_id, owner, stale in candidates:
+                if stale or (owner is not None and _owner_is_dead(owner, self.instance_id)):
+                    discard_import(db, import_id)
+        finally:
+            db.close()
+
+    def active_job(self, db: Session, model_id: str):
+        return db.query(TrainingJob).filter(
+            TrainingJob.model_id == model_id,
+            TrainingJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+
+    def submit(self, db: Session, model_id: str, mode: str = "full"):
+        if self.executor is None:
+            raise RuntimeError("Training scheduler is not running")
+
+        with self._lock:
+            existing = self.active_job(db, model_id)
+            if existing is not None:
+                return existing, False
+
+            job = TrainingJob(
+                model_id=model_id, status="queued", mode=mode,
+                owner=self.instance_id, heartbeat_at=func.now()
+            )
+            db.add(job)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another API worker queued a job for this model first.
+                db.rollback()
+                return self.active_job(db, model_id), False
+            db.refresh(job)
+
+            future = self.executor.submit(run_training_job, job.id, model_id, mode)
+            self._futures[job.id] = future
+
+        future.add_done_callback(lambda f: self._on_done(job.id, model_id, f))
+        return job, True
+
+    def cancel(self, db: Session, job: TrainingJob):
+        if job.status not in ACTIVE_STATUSES:
+            return job
+
+        job.cancel_requested = True
+        future = self._futures.get(job.id)
+        if job.status == "queued" and future is not None and future.cancel():
+            job.status = "cancelled"
+            job.finished_at = func.now()
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def _on_done(self, job_id: str, model_id: str, future):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+        error = None
+        if not future.cancelled():
+            error = future.exception()
+            result = future.result() if error is None else None
+            if result is not None:
+                training_job_duration.labels(result["mode"], result["status"]).observe(result["seconds"])
+
+        db = SessionLocal()
+        try:
+            job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
+            if job is not None and job.status in ACTIVE_STATUSES:
+                if future.cancelled():
+                    job.status = "cancelled"
+                else:
+                    job.status = "failed"
+                    job.error = str(error) if error is not None else "Training worker exited unexpectedly"
+                job.finished_at = func.now()
+            db.commit()
+            status = job.status if job is not None else None
+        finally:
+            db.close()
+
+        training_jobs_finished.labels(status or "unknown").inc()
+
+        for callback in self._listeners:
+            try:
+                callback(model_id, status)
+            except Exception as e:
+                print(f"Training job listener failed: {e}")
+
+
+training_scheduler = TrainingScheduler()
@@ -0,0 +1,152 @@
+from sqlalchemy.sql import func
+import os
+import time
+import traceback
+
+TRAINING_NICE = int(os.environ.get("TRAINING_NICE", "10"))
+INCREMENTAL_EPOCHS = int(os.environ.get("INCREMENTAL_EPOCHS", "20"))
+INCREMENTAL_REPLAY_RATIO = float(os.environ.get("INCREMENTAL_REPLAY_RATIO", "2.0"))
+INCREMENTAL_REPLAY_MIN = int(os.environ.get("INCREMENTAL_REPLAY_MIN", "200"))
+
+
+def init_worker(threads: int):
+    # Thread caps have to be in place before TensorFlow is first imported in
+    # this process, so the pool initializer runs ahead of any job.
+    for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                 "TF_NUM_INTRAOP_THREADS"):
+        os.environ[name] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+
+    if TRAINING_NICE and hasattr(os, "nice"):
+        os.nice(TRAINING_NICE)
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _cancel_requested(job_id: str) -> bool:
+    from database.database import SessionLocal
+    from database.models import TrainingJob
+
+    db = SessionLocal()
+    try:
+        return bool(db.query(TrainingJob.cancel_requested).filter(TrainingJob.id == job_id).scalar())
+    finally:
+        db.close()
+
+
+def _input_pipeline(db, model_id: str) -> str:
+    from database.models import Model
+
+    return db.query(Model.input_pipeline).filter(Model.id == model_id).scalar()
+
+
+def _backend(db, model_id: str) -> str:
+    from database.models import Model
+
+    return db.query(Model.backend).filter(Model.id == model_id).scalar() or "mlp"
+
+
+def _train_full(db, model_id: str, callbacks):
+    from models.feature_cache import FeatureCache
+    from models.training import ModelTrainer
+
+    input_pipeline = _input_pipeline(db, model_id)
+    features = FeatureCache(model_id, input_pipeline).sync(db)
+
+    trainer = ModelTrainer(model_id, input_pipeline)
+    trainer.add_features(features.X, features.sign_labels())
+    trainer.train_model(
+        callbacks=callbacks, last_sample_seq=features.last_seq, backend=_backend(db, model_id)
+    )
+
+
+def _train_incremental(db, model_id: str, callbacks):
+    from models.feature_cache import FeatureCache
+    from models.training import ModelTrainer
+    from models.model_cache import current_keras_path
+    from utils.model_utils import load_model_metadata
+    import numpy as np
+
+    metadata = load_model_metadata(model_id)
+    base_seq = metadata.get("last_sample_seq")
+    if base_seq is None or current_keras_path(model_id) is None:
+        return _train_full(db, model_id, callbacks)
+    # Only the MLP warm-starts; the lightweight backends retrain in milliseconds.
+    if metadata.get("backend", "mlp") != "mlp":
+        return _train_full(db, model_id, callbacks)
+
+    input_pipeline = _input_pipeline(db, model_id)
+    if metadata.get("input_pipeline", "landmarks") != input_pipeline:
+        return _train_full(db, model_id, callbacks)
+
+    features = FeatureCache(model_id, input_pipeline).sync(db)
+    is_new = features.seqs > base_seq
+    if not is_new.any():
+        return
+
+    new_samples = features.select(is_new)
+    trainer = ModelTrainer(model_id, input_pipeline)
+    trainer.add_features(new_samples.X, new_samples.sign_labels())
+
+    # Replaying a random slice of the old samples keeps the fine-tuned model
+    # from forgetting signs that received no new recordings.
+    old_index = np.flatnonzero(~is_new)
+    replay_size = min(len(old_index), max(INCREMENTAL_REPLAY_MIN, int(len(new_samples) * INCREMENTAL_REPLAY_RATIO)))
+    if replay_size > 0:
+        replay = features.select(np.sort(np.random.default_rng().choice(old_index, replay_size, replace=False)))
+        trainer.add_features(replay.X, replay.sign_labels())
+
+    trainer.train_incremental(
+        metadata, epochs=INCREMENTAL_EPOCHS, callbacks=callbacks, last_sample_seq=features.last_seq
+    )
+
+
+def run_training_job(job_id: str, model_id: str, mode: str = "full"):
+    from database.database import SessionLocal
+    from database.models import Model as ModelDB, TrainingJob
+    from models.model import CancellationCheck, TrainingCancelled
+    import tensorflow as tf
+
+    db = SessionLocal()
+    try:
+        job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
+        if job is None or job.status != "queued":
+            return
+        if job.cancel_requested:
+            job.status = "cancelled"
+            job.finished_at = func.now()
+            db.commit()
+            return
+
+        job.status = "running"
+        job.started_at = func.now()
+        db.commit()
+        started = time.perf_counter()
+
+        try:
+            callbacks = [CancellationCheck(lambda: _cancel_requested(job_id))]
+            if mode == "incremental":
+                _train_incremental(db, model_id, callbacks)
+            else:
+                _train_full(db, model_id, callbacks)
+
+            model = db.query(ModelDB).filter(ModelDB.id == model_id).first()
+            if model is not None:
+                model.is_trained = True
+                model.training_progress = 100
+            job.status = "completed"
+        except TrainingCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            print(f"Training failed: {e}")
+            job.status = "failed"
+            job.error = "".join(traceback.format_exception_only(type(e), e)).strip()
+
+        job.finished_at = func.now()
+        db.commit()
+        return {"mode": mode, "status": job.status, "seconds": time.perf_counter() - started}
+    finally:
+        db.close()
+        tf.keras.backend.clear_session()
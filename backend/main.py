@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .database.database import init_db
-from .routes import models, training, detection
+from .routes import models, training, detection, metrics
 import uvicorn
 
 app = FastAPI(title="Sign Recognition API", version="1.0.0")
@@ -12,7 +12,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 @app.on_event("startup")
 async def startup_event():
@@ -21,6 +23,7 @@ async def startup_event():
 app.include_router(models.router, prefix="/api/models", tags=["models"])
 app.include_router(training.router, prefix="/api/training", tags=["training"])
 app.include_router(detection.router, prefix="/api/detection", tags=["detection"])
+app.include_router(metrics.router, tags=["metrics"])
 
 @app.get("/")
 async def root():
@@ -0,0 +1,289 @@
+"""Versioned, atomically published model artifacts.
+
+Each model owns storage/models/{id}/ with one directory per version (v0001,
+v0002, ...) and a CURRENT file naming the version that is served. A version
+holds the runtime arrays as .npy files (large ones are memory-mapped on load),
+the Keras model when there is one, and manifest.json with the classes, input
+pipeline and training metadata plus a SHA-256 per file and one over the whole
+bundle. Hashing every file costs more than loading it, so file checksums are
+checked when a version is activated for rollback, and on load only with
+ARTIFACT_VERIFY_CHECKSUM=1, once per version and process.
+
+Versions are written to a temporary directory and renamed into place, and
+CURRENT is then replaced atomically, so a reader never sees a partial write.
+The newest ARTIFACT_KEEP_VERSIONS versions stay on disk for rollback.
+"""
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import numpy as np
+
+ARTIFACT_ROOT = os.path.join("storage", "models")
+ARTIFACT_FORMAT = 1
+ARTIFACT_KEEP_VERSIONS = int(os.environ.get("ARTIFACT_KEEP_VERSIONS", "3"))
+ARTIFACT_VERIFY_CHECKSUM = os.environ.get("ARTIFACT_VERIFY_CHECKSUM", "0").lower() in ("1", "true", "yes")
+# Mapping a file costs more than reading it when it is small.
+ARTIFACT_MMAP_MIN_BYTES = int(os.environ.get("ARTIFACT_MMAP_MIN_BYTES", str(1024 * 1024)))
+KERAS_FILENAME = "model.h5"
+MANIFEST_FILENAME = "manifest.json"
+# Temporary directories older than this belong to writers that died.
+STALE_TEMP_SECONDS = 3600
+
+_VERSION_PATTERN = re.compile(r"^v(\d+)$")
+
+# (model_id, version) pairs whose files this process has hashed.
+_verified = set()
+_verified_lock = threading.Lock()
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def model_dir(model_id: str) -> str:
+    return os.path.join(ARTIFACT_ROOT, model_id)
+
+
+def version_dir(model_id: str, version: str) -> str:
+    return os.path.join(model_dir(model_id), version)
+
+
+def _current_path(model_id: str) -> str:
+    return os.path.join(model_dir(model_id), "CURRENT")
+
+
+def current_version(model_id: str):
+    try:
+        with open(_current_path(model_id), 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def artifact_state(model_id: str):
+    """Cheap change marker for caches: CURRENT is replaced, never rewritten."""
+    try:
+        stat = os.stat(_current_path(model_id))
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def list_versions(model_id: str):
+    try:
+        names = os.listdir(model_dir(model_id))
+    except FileNotFoundError:
+        return []
+    versions = [name for name in names if _VERSION_PATTERN.match(name)]
+    return sorted(versions, key=lambda name: int(name[1:]))
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _bundle_checksum(files: dict) -> str:
+    entries = {name: entry["sha256"] for name, entry in files.items()}
+    return hashlib.sha256(json.dumps(entries, sort_keys=True).encode()).hexdigest()
+
+
+def _fsync_dir(path: str):
+    # Makes renames durable; directories cannot be opened this way on Windows.
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_file(path: str, write):
+    with open(path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_version(model_id: str, variants: dict, metadata: dict, keras_model=None) -> str:
+    """Publish a new version and make it current.
+
+    variants maps a precision ("float32", "int8", ...) to the arrays of the
+    runtime model in that precision; keras_model, if given, is saved for
+    warm-started retraining.
+    """
+    root = model_dir(model_id)
+    os.makedirs(root, exist_ok=True)
+    temp_dir = os.path.join(root, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(temp_dir)
+
+    try:
+        files = {}
+        for variant, arrays in variants.items():
+            for name, array in arrays.items():
+                filename = f"{variant}.{name}.npy"
+                path = os.path.join(temp_dir, filename)
+                _write_file(path, lambda f: np.save(f, np.asarray(array), allow_pickle=False))
+                files[f"{variant}/{name}"] = {"file": filename, "sha256": _sha256(path), "bytes": os.path.getsize(path)}
+
+        if keras_model is not None:
+            path = os.path.join(temp_dir, KERAS_FILENAME)
+            keras_model.save(path)
+            files["keras"] = {"file": KERAS_FILENAME, "sha256": _sha256(path), "bytes": os.path.getsize(path)}
+
+        manifest = {
+            "format": ARTIFACT_FORMAT,
+            "model_id": model_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "variants": sorted(variants),
+            "files": files,
+            "checksum": _bundle_checksum(files),
+            "metadata": metadata,
+        }
+        _write_file(
+            os.path.join(temp_dir, MANIFEST_FILENAME),
+            lambda f: f.write(json.dumps(manifest, indent=2).encode())
+        )
+
+        # Renaming onto an existing version fails, so a concurrent writer that
+        # took the same number makes this one move on to the next.
+        while True:
+            versions = list_versions(model_id)
+            version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+            try:
+                os.rename(temp_dir, version_dir(model_id, version))
+                break
+            except OSError:
+                if not os.path.exists(version_dir(model_id, version)):
+                    raise
+        _fsync_dir(root)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    set_current(model_id, version)
+    prune_versions(model_id)
+    return version
+
+
+def set_current(model_id: str, version: str, verify: bool = False):
+    if not os.path.isfile(os.path.join(version_dir(model_id, version), MANIFEST_FILENAME)):
+        raise ArtifactError(f"Unknown version {version} for model {model_id}")
+    if verify:
+        verify_version(model_id, read_manifest(model_id, version))
+
+    temp_path = f"{_current_path(model_id)}.{uuid.uuid4().hex}.tmp"
+    _write_file(temp_path, lambda f: f.write(version.encode()))
+    os.replace(temp_path, _current_path(model_id))
+    _fsync_dir(model_dir(model_id))
+
+
+def prune_versions(model_id: str, keep: int = ARTIFACT_KEEP_VERSIONS):
+    current = current_version(model_id)
+    versions = [version for version in list_versions(model_id) if version != current]
+    # The current version counts towards the versions kept.
+    for version in versions[:max(len(versions) - max(keep - 1, 0), 0)]:
+        shutil.rmtree(version_dir(model_id, version), ignore_errors=True)
+
+    root = model_dir(model_id)
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(".tmp-") and time.time() - os.path.getmtime(path) > STALE_TEMP_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def read_manifest(model_id: str, version: str = None):
+    version = version or current_version(model_id)
+    if version is None:
+        return None
+    try:
+        with open(os.path.join(version_dir(model_id, version), MANIFEST_FILENAME), 'r') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    manifest["version"] = version
+    return manifest
+
+
+def verify_version(model_id: str, manifest: dict):
+    """Check every file of a version against its recorded SHA-256."""
+    if _bundle_checksum(manifest["files"]) != manifest["checksum"]:
+        raise ArtifactError(f"Manifest checksum mismatch for model {model_id} {manifest['version']}")
+
+    directory = version_dir(model_id, manifest["version"])
+    for entry in manifest["files"].values():
+        path = os.path.join(directory, entry["file"])
+        try:
+            digest = _sha256(path)
+        except FileNotFoundError:
+            raise ArtifactError(f"Missing artifact file {path}")
+        if digest != entry["sha256"]:
+            raise ArtifactError(f"Checksum mismatch for {path}")
+
+    with _verified_lock:
+        _verified.add((model_id, manifest["version"]))
+
+
+def load_variant(model_id: str, manifest: dict, variant: str, verify: bool = ARTIFACT_VERIFY_CHECKSUM):
+    """Load the arrays of one variant of a version."""
+    if _bundle_checksum(manifest["files"]) != manifest["checksum"]:
+        raise ArtifactError(f"Manifest checksum mismatch for model {model_id} {manifest['version']}")
+    if verify and (model_id, manifest["version"]) not in _verified:
+        verify_version(model_id, manifest)
+
+    directory = version_dir(model_id, manifest["version"])
+    prefix = f"{variant}/"
+    arrays = {}
+    for key, entry in manifest["files"].items():
+        if not key.startswith(prefix):
+            continue
+        mmap_mode = "r" if entry["bytes"] >= ARTIFACT_MMAP_MIN_BYTES else None
+        array = np.load(os.path.join(directory, entry["file"]), mmap_mode=mmap_mode, allow_pickle=False)
+        arrays[key[len(prefix):]] = np.asarray(array)
+    if not arrays:
+        raise ArtifactError(f"Model {model_id} {manifest['version']} has no {variant} variant")
+    return arrays
+
+
+def keras_path(model_id: str, manifest: dict = None):
+    manifest = manifest or read_manifest(model_id)
+    if manifest is None or "keras" not in manifest["files"]:
+        return None
+    return os.path.join(version_dir(model_id, manifest["version"]), manifest["files"]["keras"]["file"])
+
+
+def version_history(model_id: str):
+    current = current_version(model_id)
+    history = []
+    for version in reversed(list_versions(model_id)):
+        manifest = read_manifest(model_id, version)
+        if manifest is None:
+            continue
+        metadata = manifest["metadata"]
+        history.append({
+            "version": version,
+            "current": version == current,
+            "created_at": manifest["created_at"],
+            "backend": metadata.get("backend", "mlp"),
+            "training_mode": metadata.get("training_mode"),
+            "training_samples": metadata.get("training_samples"),
+            "variants": manifest["variants"],
+        })
+    return history
+
+
+def remove_model_artifacts(model_id: str):
+    shutil.rmtree(model_dir(model_id), ignore_errors=True)
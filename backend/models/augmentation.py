@@ -0,0 +1,52 @@
+from tensorflow.keras.utils import Sequence
+import numpy as np
+
+
+class AugmentedSequence(Sequence):
+    def __init__(self, X, y, batch_size=16, augmentation_factor=3, noise_std=0.01,
+                 scale_range=(0.95, 1.05), seed=42, shuffle=True):
+        super().__init__()
+        self.X = np.asarray(X, dtype=np.float32)
+        self.y = np.asarray(y, dtype=np.float32)
+        self.batch_size = batch_size
+        self.augmentation_factor = augmentation_factor
+        self.noise_std = noise_std
+        self.scale_range = scale_range
+        self.seed = seed
+        self.shuffle = shuffle
+        # Each sample is seen once as-is, augmentation_factor times with noise
+        # and augmentation_factor times scaled, like the old materialized set.
+        self.variants = 1 + 2 * augmentation_factor
+        self.epoch = 0
+        self.order = self._epoch_order()
+
+    @property
+    def num_samples(self) -> int:
+        return len(self.X) * self.variants
+
+    def __len__(self):
+        return (self.num_samples + self.batch_size - 1) // self.batch_size
+
+    def __getitem__(self, index):
+        ids = self.order[index * self.batch_size:(index + 1) * self.batch_size]
+        samples, variants = np.divmod(ids, self.variants)
+
+        rng = np.random.default_rng([self.seed, self.epoch, index])
+        X_batch = self.X[samples]
+
+        noisy = (variants >= 1) & (variants <= self.augmentation_factor)
+        X_batch[noisy] += rng.normal(0, self.noise_std, (int(noisy.sum()), self.X.shape[1]))
+
+        scaled = variants > self.augmentation_factor
+        X_batch[scaled] *= rng.uniform(*self.scale_range, (int(scaled.sum()), 1))
+
+        return X_batch, self.y[samples]
+
+    def on_epoch_end(self):
+        self.epoch += 1
+        self.order = self._epoch_order()
+
+    def _epoch_order(self):
+        if not self.shuffle:
+            return np.arange(self.num_samples)
+        return np.random.default_rng([self.seed, self.epoch]).permutation(self.num_samples)
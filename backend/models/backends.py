@@ -0,0 +1,68 @@
+"""Lightweight classifier backends for models with few signs and samples.
+
+Both train in milliseconds and are served by the NumPy runtime, so the
+detection path handles them like the exported MLP.
+"""
+from .numpy_runtime import NumpySignModel, KNNSignModel
+import numpy as np
+import os
+
+BACKENDS = ("mlp", "logistic", "knn", "auto")
+DEFAULT_BACKEND = os.environ.get("DEFAULT_MODEL_BACKEND", "mlp")
+# Tried by the auto mode from cheapest to most expensive; the MLP is used when
+# none reaches the validation target.
+AUTO_CANDIDATES = ("logistic", "knn")
+AUTO_TARGET_ACCURACY = float(os.environ.get("AUTO_BACKEND_TARGET_ACCURACY", "0.95"))
+# kNN keeps every sample in memory and its cost grows with them.
+AUTO_MAX_SAMPLES = int(os.environ.get("AUTO_BACKEND_MAX_SAMPLES", "20000"))
+KNN_NEIGHBORS = int(os.environ.get("KNN_NEIGHBORS", "5"))
+LOGISTIC_C = float(os.environ.get("LOGISTIC_C", "1.0"))
+LOGISTIC_MAX_ITER = int(os.environ.get("LOGISTIC_MAX_ITER", "1000"))
+
+
+def fit_logistic(X, labels, num_classes: int, input_pipeline: str) -> NumpySignModel:
+    from sklearn.linear_model import LogisticRegression
+
+    present = np.unique(labels)
+    if len(present) < 2:
+        raise ValueError("Logistic regression needs samples of at least two signs")
+
+    classifier = LogisticRegression(C=LOGISTIC_C, max_iter=LOGISTIC_MAX_ITER)
+    classifier.fit(X, labels)
+
+    # Exported as a single softmax layer. Signs missing from the training data
+    # get a bias that keeps their probability at zero.
+    W = np.zeros((X.shape[1], num_classes), dtype=np.float32)
+    b = np.full(num_classes, -1e4, dtype=np.float32)
+    if len(classifier.classes_) == 2:
+        # The binary model scores only the second class; softmax over (0, z)
+        # equals its sigmoid.
+        negative, positive = classifier.classes_
+        W[:, positive] = classifier.coef_[0]
+        b[positive] = classifier.intercept_[0]
+        b[negative] = 0.0
+    else:
+        W[:, classifier.classes_] = classifier.coef_.T
+        b[classifier.classes_] = classifier.intercept_
+
+    return NumpySignModel([W], [b], ["softmax"], X.shape[1], input_pipeline)
+
+
+def fit_knn(X, labels, num_classes: int, input_pipeline: str) -> KNNSignModel:
+    return KNNSignModel(X, labels, num_classes, KNN_NEIGHBORS, X.shape[1], input_pipeline)
+
+
+FITTERS = {
+    "logistic": fit_logistic,
+    "knn": fit_knn,
+}
+
+
+def fit_backend(backend: str, X, labels, num_classes: int, input_pipeline: str):
+    return FITTERS[backend](np.asarray(X, dtype=np.float32), np.asarray(labels), num_classes, input_pipeline)
+
+
+def accuracy(model, X, labels):
+    if len(labels) == 0:
+        return None
+    return float(np.mean(np.argmax(model.predict(X), axis=1) == labels))
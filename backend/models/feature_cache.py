@@ -0,0 +1,187 @@
+from database.models import TrainingSample
+from database.samples import load_training_samples, dataset_state, count_samples_up_to
+from .preprocessing import DEFAULT_INPUT_PIPELINE, pipeline_input_dim, preprocess_pipeline
+import json
+import os
+import shutil
+import numpy as np
+
+FEATURE_CACHE_DIR = os.environ.get("FEATURE_CACHE_DIR", "storage/features")
+FEATURE_CACHE_MAX_SEGMENTS = int(os.environ.get("FEATURE_CACHE_MAX_SEGMENTS", "8"))
+FEATURE_FORMAT = 1
+
+
+class FeatureSet:
+    def __init__(self, X, labels, seqs, signs, last_seq: int):
+        self.X = X
+        self.labels = labels
+        self.seqs = seqs
+        self.signs = signs
+        self.last_seq = last_seq
+
+    def __len__(self):
+        return len(self.labels)
+
+    def sign_labels(self):
+        return np.asarray(self.signs, dtype=object)[self.labels].tolist()
+
+    def select(self, index):
+        return FeatureSet(self.X[index], self.labels[index], self.seqs[index], self.signs, self.last_seq)
+
+
+class FeatureCache:
+    """Preprocessed training matrix of one model, stored as append-only .npy segments.
+
+    The cache is valid for a dataset version; when the version moves on, samples
+    with a sequence number past the cached one are preprocessed and appended as
+    a new segment. Deleted samples show up as a row-count mismatch and force a
+    rebuild.
+    """
+
+    def __init__(self, model_id: str, input_pipeline: str = DEFAULT_INPUT_PIPELINE, root: str = FEATURE_CACHE_DIR):
+        self.model_id = model_id
+        self.input_pipeline = input_pipeline
+        self.input_dim = pipeline_input_dim(input_pipeline)
+        self.path = os.path.join(root, model_id)
+        self.meta_path = os.path.join(self.path, "meta.json")
+
+    def sync(self, db) -> FeatureSet:
+        last_seq, version = dataset_state(db, self.model_id)
+        meta = self._read_meta()
+        if meta is not None and self._matches_format(meta) and meta["dataset_version"] == version:
+            return self._load(meta)
+
+        if meta is None or not self._is_reusable(db, meta, last_seq):
+            meta = self._reset()
+        if last_seq > meta["last_seq"]:
+            self._append(db, meta, last_seq)
+        meta["dataset_version"] = version
+        if len(meta["segments"]) > FEATURE_CACHE_MAX_SEGMENTS:
+            self._compact(meta)
+        self._write_meta(meta)
+
+        return self._load(meta)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _matches_format(self, meta) -> bool:
+        return (
+            meta.get("format") == FEATURE_FORMAT
+            and meta.get("input_pipeline") == self.input_pipeline
+            and meta.get("input_dim") == self.input_dim
+        )
+
+    def _is_reusable(self, db, meta, last_seq: int) -> bool:
+        return (
+            self._matches_format(meta)
+            and meta["last_seq"] <= last_seq
+            and count_samples_up_to(db, self.model_id, meta["last_seq"]) == meta["rows"]
+        )
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_meta(self, meta):
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _reset(self):
+        self.clear()
+        os.makedirs(self.path, exist_ok=True)
+        return {
+            "format": FEATURE_FORMAT,
+            "input_pipeline": self.input_pipeline,
+            "input_dim": self.input_dim,
+            "dataset_version": None,
+            "last_seq": 0,
+            "rows": 0,
+            "signs": [],
+            "segments": [],
+            "next_segment": 0,
+        }
+
+    def _segment_paths(self, segment: int):
+        return {
+            name: os.path.join(self.path, f"{segment:05d}_{name}.npy")
+            for name in ("X", "labels", "seqs")
+        }
+
+    def _write_segment(self, meta, X, labels, seqs):
+        segment = meta["next_segment"]
+        for name, path in self._segment_paths(segment).items():
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, {"X": X, "labels": labels, "seqs": seqs}[name])
+            os.replace(tmp_path, path)
+
+        meta["segments"].append(segment)
+        meta["next_segment"] = segment + 1
+
+    def _append(self, db, meta, last_seq: int):
+        points, counts, signs, seqs = load_training_samples(
+            db, self.model_id,
+            where=(TrainingSample.seq > meta["last_seq"]) & (TrainingSample.seq <= last_seq),
+            return_seq=True
+        )
+        meta["rows"] += len(signs)
+        meta["last_seq"] = last_seq
+
+        # Samples without points were never trainable, they only count as rows.
+        keep = counts > 0
+        point_keep = np.repeat(keep, counts)
+        if not keep.any():
+            return
+
+        X = preprocess_pipeline(points[point_keep], counts[keep], self.input_pipeline, self.input_dim)
+
+        sign_index = {sign: i for i, sign in enumerate(meta["signs"])}
+        labels = np.empty(int(keep.sum()), dtype=np.int32)
+        for i, sign in enumerate(sign for sign, kept in zip(signs, keep) if kept):
+            if sign not in sign_index:
+                sign_index[sign] = len(meta["signs"])
+                meta["signs"].append(sign)
+            labels[i] = sign_index[sign]
+
+        self._write_segment(meta, X, labels, seqs[keep])
+
+    def _load_segments(self, segments, mmap_mode="r"):
+        parts = {"X": [], "labels": [], "seqs": []}
+        for segment in segments:
+            for name, path in self._segment_paths(segment).items():
+                parts[name].append(np.load(path, mmap_mode=mmap_mode))
+        return parts
+
+    def _compact(self, meta):
+        old_segments = list(meta["segments"])
+        parts = self._load_segments(old_segments)
+
+        meta["segments"] = []
+        self._write_segment(meta, *(np.concatenate(parts[name]) for name in ("X", "labels", "seqs")))
+        self._write_meta(meta)
+
+        del parts
+        for segment in old_segments:
+            for path in self._segment_paths(segment).values():
+                os.remove(path)
+
+    def _load(self, meta) -> FeatureSet:
+        parts = self._load_segments(meta["segments"])
+
+        if len(meta["segments"]) == 1:
+            # A single segment is handed out memory-mapped, without a copy.
+            X, labels, seqs = parts["X"][0], parts["labels"][0], parts["seqs"][0]
+        elif meta["segments"]:
+            X, labels, seqs = (np.concatenate(parts[name]) for name in ("X", "labels", "seqs"))
+        else:
+            X = np.empty((0, self.input_dim), dtype=np.float32)
+            labels = np.empty(0, dtype=np.int32)
+            seqs = np.empty(0, dtype=np.int64)
+
+        return FeatureSet(X, labels, seqs, meta["signs"], meta["last_seq"])
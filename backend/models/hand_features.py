@@ -0,0 +1,120 @@
+import numpy as np
+
+HAND_POINTS = 21
+MAX_HANDS = 2
+
+FINGERTIPS = np.array([4, 8, 12, 16, 20])
+FINGER_BASES = np.array([1, 5, 9, 13, 17])
+FINGER_CHAINS = np.array([
+    [0, 1, 2, 3, 4],
+    [0, 5, 6, 7, 8],
+    [0, 9, 10, 11, 12],
+    [0, 13, 14, 15, 16],
+    [0, 17, 18, 19, 20],
+])
+JOINT_TRIPLES = np.concatenate([
+    np.stack([chain[:-2], chain[1:-1], chain[2:]], axis=1) for chain in FINGER_CHAINS
+])
+TIP_PAIRS = np.stack(np.triu_indices(len(FINGERTIPS), k=1), axis=1)
+
+# Per hand: fingertip pair distances, fingertip-wrist distances, joint angles,
+# spread angles between neighbouring fingers and a presence flag.
+FEATURES_PER_HAND = len(TIP_PAIRS) + len(FINGERTIPS) + len(JOINT_TRIPLES) + (len(FINGERTIPS) - 1) + 1
+HAND_FEATURE_DIM = FEATURES_PER_HAND * MAX_HANDS + 1
+
+EPSILON = 1e-8
+
+
+def _angles(u, v):
+    norms = np.linalg.norm(u, axis=-1) * np.linalg.norm(v, axis=-1)
+    cos_angle = np.einsum("...k,...k->...", u, v) / np.maximum(norms, EPSILON)
+    return np.arccos(np.clip(cos_angle, -1.0, 1.0)) / np.pi
+
+
+def single_hand_features(hands):
+    """Invariant features of (N, 21, 3) hands, without the presence flag.
+
+    Distances are divided by the wrist to middle-finger-base length and angles
+    are scaled to [0, 1], so the result does not change under translation,
+    uniform scaling or rotation of the hand.
+    """
+    hands = np.asarray(hands, dtype=np.float64)
+    palm = np.linalg.norm(hands[:, 9] - hands[:, 0], axis=-1)
+    scale = np.where(palm > EPSILON, 1.0 / np.maximum(palm, EPSILON), 0.0)[:, np.newaxis]
+
+    tips = hands[:, FINGERTIPS]
+    tip_distances = np.linalg.norm(tips[:, TIP_PAIRS[:, 0]] - tips[:, TIP_PAIRS[:, 1]], axis=-1) * scale
+    wrist_distances = np.linalg.norm(tips - hands[:, :1], axis=-1) * scale
+
+    a, b, c = (hands[:, JOINT_TRIPLES[:, i]] for i in range(3))
+    joint_angles = _angles(a - b, c - b)
+
+    directions = tips - hands[:, FINGER_BASES]
+    spread_angles = _angles(directions[:, :-1], directions[:, 1:])
+
+    features = np.concatenate([tip_distances, wrist_distances, joint_angles, spread_angles], axis=1)
+    # Degenerate hands (all points on the wrist) carry no geometry.
+    features[palm <= EPSILON] = 0.0
+    return features
+
+
+def extract_hand_features(hands, present=None):
+    """Batch features for (N, hands, 21, 3) arrays with up to two hands per frame."""
+    hands = np.asarray(hands, dtype=np.float64)
+    if hands.ndim != 4 or hands.shape[2:] != (HAND_POINTS, 3) or hands.shape[1] > MAX_HANDS:
+        raise ValueError(f"Hands must have shape (frames, <= {MAX_HANDS}, {HAND_POINTS}, 3)")
+
+    num_frames, num_hands = hands.shape[:2]
+    if present is None:
+        present = np.ones((num_frames, num_hands), dtype=bool)
+
+    X = np.zeros((num_frames, HAND_FEATURE_DIM), dtype=np.float32)
+    for hand in range(num_hands):
+        rows = np.flatnonzero(present[:, hand])
+        if len(rows) == 0:
+            continue
+        start = hand * FEATURES_PER_HAND
+        X[rows, start:start + FEATURES_PER_HAND - 1] = single_hand_features(hands[rows, hand])
+        X[rows, start + FEATURES_PER_HAND - 1] = 1.0
+
+    if num_hands == MAX_HANDS:
+        rows = np.flatnonzero(present.all(axis=1))
+        if len(rows) > 0:
+            pair = hands[rows]
+            palms = np.linalg.norm(pair[:, :, 9] - pair[:, :, 0], axis=-1).mean(axis=1)
+            wrists = np.linalg.norm(pair[:, 0, 0] - pair[:, 1, 0], axis=-1)
+            X[rows, -1] = np.where(palms > EPSILON, wrists / np.maximum(palms, EPSILON), 0.0)
+
+    return X
+
+
+def hands_from_packed(points, counts):
+    """Split ragged landmark sets into (N, 2, 21, 3) hands plus a presence mask.
+
+    Every complete run of 21 points is one hand; leftover points are ignored.
+    The two hands are ordered by wrist x so the layout does not depend on the
+    order the tracker reported them in.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    counts = np.asarray(counts, dtype=np.int64)
+
+    offsets = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(counts[:-1], out=offsets[1:])
+    num_hands = np.minimum(counts // HAND_POINTS, MAX_HANDS)
+
+    hands = np.zeros((len(counts), MAX_HANDS, HAND_POINTS, 3), dtype=np.float64)
+    present = np.arange(MAX_HANDS) < num_hands[:, np.newaxis]
+    for hand in range(MAX_HANDS):
+        rows = np.flatnonzero(present[:, hand])
+        index = offsets[rows, np.newaxis] + hand * HAND_POINTS + np.arange(HAND_POINTS)
+        hands[rows, hand] = points[index]
+
+    swap = present.all(axis=1) & (hands[:, 0, 0, 0] > hands[:, 1, 0, 0])
+    hands[swap] = hands[swap, ::-1]
+
+    return hands, present
+
+
+def hand_features_packed(points, counts):
+    hands, present = hands_from_packed(points, counts)
+    return extract_hand_features(hands, present)
@@ -0,0 +1,147 @@
+from concurrent.futures import Future
+from utils.metrics import metrics, SIZE_BUCKETS
+import numpy as np
+import os
+import queue
+import threading
+import time
+
+MAX_BATCH_SIZE = int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", "5"))
+# A model's batcher thread exits after this long without requests.
+IDLE_SECONDS = float(os.environ.get("INFERENCE_IDLE_SECONDS", "60"))
+
+batch_size_histogram = metrics.histogram(
+    "sign_inference_batch_size", "Frames per micro-batch", buckets=SIZE_BUCKETS
+)
+batch_duration = metrics.histogram(
+    "sign_inference_batch_duration_seconds", "Model forward pass time per micro-batch"
+)
+
+
+class _ModelBatcher:
+    def __init__(self, engine, model_id: str, max_batch_size: int, max_wait_ms: float):
+        self.engine = engine
+        self.model_id = model_id
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(
+            target=self._run, name=f"batcher-{model_id}", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, model, features) -> Future:
+        future = Future()
+        self.queue.put((model, features, future))
+        return future
+
+    def _drain(self, batch):
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _collect(self):
+        batch = [self.queue.get(timeout=IDLE_SECONDS)]
+        # A lone request is dispatched at once; requests that queued up while
+        # the previous forward pass ran are batched with it.
+        self._drain(batch)
+        if len(batch) == 1:
+            return batch
+
+        # Under that kind of load, waiting a little more fills the batch.
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        self._drain(batch)
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._collect()
+            except queue.Empty:
+                if self.engine._retire(self):
+                    return
+                continue
+
+            # A reload can swap the model object while requests are queued,
+            # so every request runs against the model it was submitted with.
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[0]), []).append(item)
+
+            for items in groups.values():
+                self._run_group(items)
+
+    def _run_group(self, items):
+        pending = [item for item in items if item[2].set_running_or_notify_cancel()]
+        if not pending:
+            return
+
+        model = pending[0][0]
+        start = time.perf_counter()
+        try:
+            X = np.stack([features for _, features, _ in pending])
+            predictions = model.predict(X)
+            batch_duration.observe(time.perf_counter() - start)
+            batch_size_histogram.observe(len(pending))
+        except Exception as e:
+            for _, _, future in pending:
+                future.set_exception(e)
+            return
+
+        for (_, _, future), prediction in zip(pending, predictions):
+            future.set_result(prediction)
+
+
+class BatchInferenceEngine:
+    def __init__(self, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch_size > 1
+
+    def _retire(self, batcher: _ModelBatcher) -> bool:
+        # Submissions enqueue under the same lock, so nothing can be added to
+        # a batcher once it has been dropped here.
+        with self._lock:
+            if not batcher.queue.empty():
+                return False
+            if self._batchers.get(batcher.model_id) is batcher:
+                del self._batchers[batcher.model_id]
+            return True
+
+    def submit(self, model_id: str, model, features) -> Future:
+        if not self.enabled:
+            future = Future()
+            try:
+                future.set_result(model.predict(np.array([features]))[0])
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        with self._lock:
+            batcher = self._batchers.get(model_id)
+            if batcher is None:
+                batcher = _ModelBatcher(self, model_id, self.max_batch_size, self.max_wait_ms)
+                self._batchers[model_id] = batcher
+            return batcher.submit(model, features)
+
+    def predict(self, model_id: str, model, features):
+        return self.submit(model_id, model, features).result()
+
+
+inference_engine = BatchInferenceEngine()
@@ -2,13 +2,40 @@ import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense, Dropout, BatchNormalization
 from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.callbacks import EarlyStopping
+from tensorflow.keras.callbacks import EarlyStopping, Callback
+from .preprocessing import DEFAULT_INPUT_PIPELINE, preprocess_frames
 import numpy as np
+import time
+
+class TrainingCancelled(Exception):
+    pass
+
+class CancellationCheck(Callback):
+    def __init__(self, should_cancel, interval=1.0):
+        super().__init__()
+        self.should_cancel = should_cancel
+        self.interval = interval
+        self.last_check = 0.0
+
+    def _check(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_check < self.interval:
+            return
+        self.last_check = now
+        if self.should_cancel():
+            raise TrainingCancelled()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._check()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self._check(force=True)
 
 class SignRecognitionModel:
-    def __init__(self, num_classes: int, input_dim: int = 126):
+    def __init__(self, num_classes: int, input_dim: int = 126, input_pipeline: str = DEFAULT_INPUT_PIPELINE):
         self.num_classes = num_classes
         self.input_dim = input_dim
+        self.input_pipeline = input_pipeline
         self.model = None
 
     def build_model(self):
@@ -27,15 +54,41 @@ class SignRecognitionModel:
             Dense(self.num_classes, activation='softmax')
         ])
 
+        self.compile()
+
+        return self.model
+
+    def compile(self, learning_rate=0.001):
         self.model.compile(
-            optimizer=Adam(learning_rate=0.001),
+            optimizer=Adam(learning_rate=learning_rate),
             loss='categorical_crossentropy',
             metrics=['accuracy']
         )
 
-        return self.model
+    def expand_output(self, num_classes: int):
+        if self.model is None:
+            raise ValueError("Model not trained yet")
+        if num_classes < self.num_classes:
+            raise ValueError("Cannot shrink the output layer")
+        if num_classes == self.num_classes:
+            return
+
+        old_model = self.model
+        old_kernel, old_bias = old_model.layers[-1].get_weights()
+
+        self.num_classes = num_classes
+        self.build_model()
 
-    def train(self, X_train, y_train, X_val=None, y_val=None, epochs=100):
+        for layer, old_layer in zip(self.model.layers[:-1], old_model.layers[:-1]):
+            layer.set_weights(old_layer.get_weights())
+
+        # Existing classes keep their weights; new ones start from the fresh initializer.
+        kernel, bias = self.model.layers[-1].get_weights()
+        kernel[:, :old_kernel.shape[1]] = old_kernel
+        bias[:old_bias.shape[0]] = old_bias
+        self.model.layers[-1].set_weights([kernel, bias])
+
+    def train(self, X_train, y_train=None, X_val=None, y_val=None, epochs=100, callbacks=None):
         if self.model is None:
             self.build_model()
 
@@ -47,13 +100,16 @@ class SignRecognitionModel:
 
         validation_data = (X_val, y_val) if X_val is not None and y_val is not None else None
 
+        # Without y_train, X_train is a batched dataset such as AugmentedSequence.
+        batch_size = 16 if y_train is not None else None
+
         history = self.model.fit(
             X_train, y_train,
             validation_data=validation_data,
             epochs=epochs,
-            batch_size=16,
+            batch_size=batch_size,
             verbose=1,
-            callbacks=[early_stopping]
+            callbacks=[early_stopping] + list(callbacks or [])
         )
 
         return history
@@ -61,7 +117,7 @@ class SignRecognitionModel:
     def predict(self, X):
         if self.model is None:
             raise ValueError("Model not trained yet")
-        return self.model.predict(X)
+        return self.model.predict_on_batch(X)
 
     def save(self, filepath):
         if self.model is None:
@@ -72,6 +128,10 @@ class SignRecognitionModel:
         self.model = tf.keras.models.load_model(filepath)
 
     def preprocess_landmarks(self, landmarks):
+        if self.input_pipeline != "landmarks":
+            frame = np.asarray(landmarks, dtype=np.float64).reshape(1, -1, 3)
+            return preprocess_frames(frame, self.input_pipeline, self.input_dim)[0]
+        
         landmarks_array = np.array(landmarks)
         
         if len(landmarks_array.shape) == 1:
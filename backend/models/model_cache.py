@@ -0,0 +1,268 @@
+from collections import OrderedDict
+from .artifacts import artifact_state, keras_path, load_variant, read_manifest
+from .numpy_runtime import PRECISIONS, dequantized_weights, load_runtime_model, runtime_model_from_arrays
+from .preprocessing import DEFAULT_INPUT_PIPELINE
+from utils.metrics import metrics, DURATION_BUCKETS
+import json
+import os
+import threading
+import time
+
+MODEL_CACHE_MAX_MODELS = int(os.environ.get("MODEL_CACHE_MAX_MODELS", "64"))
+MODEL_CACHE_MAX_BYTES = int(os.environ.get("MODEL_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Most compact precision the detection path may serve, and the validation
+# accuracy it may lose against float32 for a compact variant to be used.
+MODEL_PRECISION = os.environ.get("MODEL_PRECISION", "int8")
+QUANTIZED_MAX_ACCURACY_LOSS = float(os.environ.get("QUANTIZED_MAX_ACCURACY_LOSS", "0.01"))
+
+model_load_duration = metrics.histogram(
+    "sign_model_load_duration_seconds", "Time to load a model artifact into the cache",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5) + DURATION_BUCKETS[:3]
+)
+
+
+def legacy_artifact_paths(model_id: str):
+    """Files of models trained before the versioned artifact format."""
+    return {
+        "keras": f"storage/models/{model_id}.h5",
+        "numpy": f"storage/models/{model_id}.npz",
+        "float16": f"storage/models/{model_id}_float16.npz",
+        "int8": f"storage/models/{model_id}_int8.npz",
+        "metadata": f"storage/models/{model_id}_metadata.json",
+    }
+
+
+def select_precision(metadata: dict, max_precision: str = MODEL_PRECISION,
+                     tolerance: float = QUANTIZED_MAX_ACCURACY_LOSS) -> str:
+    """Pick the most compact precision, up to max_precision, whose recorded
+    accuracy loss is within tolerance; float32 when none qualifies."""
+    if max_precision not in PRECISIONS:
+        raise ValueError(f"Unknown MODEL_PRECISION: {max_precision}")
+
+    quantized = metadata.get("quantized", {})
+    for precision in reversed(PRECISIONS[1:PRECISIONS.index(max_precision) + 1]):
+        loss = quantized.get(precision, {}).get("accuracy_loss")
+        if loss is not None and loss <= tolerance:
+            return precision
+    return "float32"
+
+
+def artifact_version(model_id: str):
+    state = artifact_state(model_id)
+    if state is not None:
+        return ("versioned",) + state
+
+    version = []
+    for path in legacy_artifact_paths(model_id).values():
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        version.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+def artifact_exists(model_id: str) -> bool:
+    if artifact_state(model_id) is not None:
+        return True
+    return os.path.exists(legacy_artifact_paths(model_id)["metadata"])
+
+
+def current_keras_path(model_id: str):
+    """Keras model of the served version, for warm-started retraining."""
+    manifest = read_manifest(model_id)
+    if manifest is not None:
+        return keras_path(model_id, manifest)
+    path = legacy_artifact_paths(model_id)["keras"]
+    return path if os.path.exists(path) else None
+
+
+def _load_keras(metadata, path):
+    from .model import SignRecognitionModel
+    model = SignRecognitionModel(
+        metadata['num_classes'], metadata['input_dim'],
+        metadata.get('input_pipeline', DEFAULT_INPUT_PIPELINE)
+    )
+    model.load(path)
+    return model
+
+
+def load_model_artifact(model_id: str):
+    manifest = read_manifest(model_id)
+    if manifest is not None:
+        metadata = manifest["metadata"]
+        precision = select_precision(metadata)
+        if precision in manifest["variants"]:
+            model = runtime_model_from_arrays(load_variant(model_id, manifest, precision))
+        elif "float32" in manifest["variants"]:
+            model = runtime_model_from_arrays(load_variant(model_id, manifest, "float32"))
+        else:
+            model = _load_keras(metadata, keras_path(model_id, manifest))
+        return model, metadata
+
+    paths = legacy_artifact_paths(model_id)
+
+    if not os.path.exists(paths["metadata"]):
+        return None
+    if not os.path.exists(paths["numpy"]) and not os.path.exists(paths["keras"]):
+        return None
+
+    with open(paths["metadata"], 'r') as f:
+        metadata = json.load(f)
+
+    precision = select_precision(metadata)
+    if precision != "float32" and os.path.exists(paths[precision]):
+        model = load_runtime_model(paths[precision])
+    elif os.path.exists(paths["numpy"]):
+        model = load_runtime_model(paths["numpy"])
+    else:
+        model = _load_keras(metadata, paths["keras"])
+
+    return model, metadata
+
+
+class CacheEntry:
+    def __init__(self, model, metadata, version, nbytes: int):
+        self.model = model
+        self.metadata = metadata
+        self.classes = metadata['classes']
+        self.precision = getattr(model, "precision", "float32")
+        self.version = version
+        self.nbytes = nbytes
+
+
+class _PendingLoad:
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+
+
+class ModelCache:
+    def __init__(self, max_models: int = MODEL_CACHE_MAX_MODELS, max_bytes: int = MODEL_CACHE_MAX_BYTES,
+                 loader=load_model_artifact, versioner=artifact_version):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.versioner = versioner
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.load_failures = 0
+
+    def get(self, model_id: str):
+        version = self.versioner(model_id)
+
+        with self._lock:
+            entry = self._entries.get(model_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(model_id)
+                self.hits += 1
+                return entry
+
+            if entry is not None:
+                self._remove(model_id)
+                self.invalidations += 1
+
+            pending = self._pending.get(model_id)
+            owner = pending is None
+            if owner:
+                pending = _PendingLoad()
+                self._pending[model_id] = pending
+            self.misses += 1
+
+        if not owner:
+            pending.done.wait()
+            return pending.entry
+
+        try:
+            pending.entry = self._load(model_id, version)
+        finally:
+            with self._lock:
+                if self._pending.get(model_id) is pending:
+                    del self._pending[model_id]
+                    if pending.entry is not None:
+                        self._insert(model_id, pending.entry)
+            pending.done.set()
+
+        return pending.entry
+
+    def _load(self, model_id: str, version):
+        start = time.perf_counter()
+        try:
+            loaded = self.loader(model_id)
+            model_load_duration.observe(time.perf_counter() - start)
+            if loaded is not None:
+                model, metadata = loaded
+                return CacheEntry(model, metadata, version, estimate_model_bytes(model))
+        except Exception as e:
+            print(f"Error loading model {model_id}: {e}")
+
+        with self._lock:
+            self.load_failures += 1
+        return None
+
+    def _insert(self, model_id: str, entry: CacheEntry):
+        self._entries[model_id] = entry
+        self.total_bytes += entry.nbytes
+
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_models or self.total_bytes > self.max_bytes
+        ):
+            evicted_id = next(iter(self._entries))
+            self._remove(evicted_id)
+            self.evictions += 1
+
+    def _remove(self, model_id: str):
+        entry = self._entries.pop(model_id)
+        self.total_bytes -= entry.nbytes
+        dequantized_weights.discard(entry.model)
+
+    def invalidate(self, model_id: str):
+        with self._lock:
+            # A load that is still running belongs to the old artifact; dropping it
+            # from _pending keeps it from being inserted when it finishes.
+            self._pending.pop(model_id, None)
+            if model_id in self._entries:
+                self._remove(model_id)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._entries.clear()
+            self.total_bytes = 0
+        dequantized_weights.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            precisions = {}
+            for entry in self._entries.values():
+                precisions[entry.precision] = precisions.get(entry.precision, 0) + 1
+            return {
+                "models": len(self._entries),
+                "precisions": precisions,
+                "bytes": self.total_bytes,
+                "max_models": self.max_models,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "load_failures": self.load_failures,
+                "dequantized": dequantized_weights.stats(),
+            }
+
+
+def estimate_model_bytes(model) -> int:
+    nbytes = getattr(model, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return int(model.model.count_params() * 4)
+
+
+model_cache = ModelCache()
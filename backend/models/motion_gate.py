@@ -0,0 +1,127 @@
+from collections import OrderedDict
+import numpy as np
+import os
+import threading
+
+MOTION_GATE = os.environ.get("MOTION_GATE", "0").lower() in ("1", "true", "yes")
+MOTION_GATE_THRESHOLD = float(os.environ.get("MOTION_GATE_THRESHOLD", "0.02"))
+MOTION_GATE_CACHE_SIZE = int(os.environ.get("MOTION_GATE_CACHE_SIZE", "256"))
+MOTION_GATE_MAX_CLIENTS = int(os.environ.get("MOTION_GATE_MAX_CLIENTS", "4096"))
+
+
+class _ClientState:
+    __slots__ = ("model", "features", "prediction")
+
+    def __init__(self, model, features, prediction):
+        self.model = model
+        self.features = features
+        self.prediction = prediction
+
+
+class MotionGate:
+    """Reuses predictions for preprocessed landmark vectors that barely moved.
+
+    Each client keeps the vector of its last inference; while new vectors stay
+    within threshold of it (largest per-feature difference), that result is
+    returned. Otherwise a per-model LRU keyed on the vector quantized to
+    threshold-sized steps is tried, which also catches clients returning to a
+    pose seen before. Entries remember the model object they were computed
+    with, so a reloaded model never serves stale results.
+    """
+
+    def __init__(self, enabled: bool = MOTION_GATE, threshold: float = MOTION_GATE_THRESHOLD,
+                 cache_size: int = MOTION_GATE_CACHE_SIZE, max_clients: int = MOTION_GATE_MAX_CLIENTS):
+        self.enabled = enabled and threshold > 0
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.max_clients = max_clients
+        self._clients = OrderedDict()
+        self._results = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.motion_skips = 0
+        self.cache_hits = 0
+
+    def _key(self, features):
+        return np.round(features / self.threshold).astype(np.int32).tobytes()
+
+    def lookup(self, client_key, model_id: str, model, features):
+        """Return a reusable prediction for features, or None if inference is needed."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            self.lookups += 1
+
+            state = self._clients.get((client_key, model_id))
+            if state is not None and state.model is model and state.features.shape == features.shape:
+                if np.max(np.abs(features - state.features)) <= self.threshold:
+                    self._clients.move_to_end((client_key, model_id))
+                    self.motion_skips += 1
+                    return state.prediction
+
+            cached = self._results.get(model_id)
+            if cached is not None and cached[0] is model:
+                key = self._key(features)
+                prediction = cached[1].get(key)
+                if prediction is not None:
+                    cached[1].move_to_end(key)
+                    self.cache_hits += 1
+                    return prediction
+
+        return None
+
+    def store(self, client_key, model_id: str, model, features, prediction):
+        if not self.enabled:
+            return
+
+        prediction = np.array(prediction, copy=True)
+        prediction.setflags(write=False)
+        features = np.array(features, dtype=np.float32, copy=True)
+
+        with self._lock:
+            self._clients[(client_key, model_id)] = _ClientState(model, features, prediction)
+            self._clients.move_to_end((client_key, model_id))
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+
+            if self.cache_size <= 0:
+                return
+            cached = self._results.get(model_id)
+            if cached is None or cached[0] is not model:
+                cached = (model, OrderedDict())
+                self._results[model_id] = cached
+            key = self._key(features)
+            cached[1][key] = prediction
+            cached[1].move_to_end(key)
+            while len(cached[1]) > self.cache_size:
+                cached[1].popitem(last=False)
+
+    def forget_client(self, client_key):
+        with self._lock:
+            for key in [key for key in self._clients if key[0] == client_key]:
+                del self._clients[key]
+
+    def invalidate(self, model_id: str):
+        with self._lock:
+            self._results.pop(model_id, None)
+            for key in [key for key in self._clients if key[1] == model_id]:
+                del self._clients[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            skipped = self.motion_skips + self.cache_hits
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "motion_skips": self.motion_skips,
+                "cache_hits": self.cache_hits,
+                "inferences": self.lookups - skipped,
+                "skip_rate": skipped / self.lookups if self.lookups else 0.0,
+                "clients": len(self._clients),
+                "cached_results": sum(len(results) for _, results in self._results.values()),
+            }
+
+
+motion_gate = MotionGate()
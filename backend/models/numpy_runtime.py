@@ -0,0 +1,376 @@
+from collections import OrderedDict
+from .preprocessing import DEFAULT_INPUT_PIPELINE, preprocess_frames
+import os
+import threading
+import numpy as np
+
+ACTIVATIONS = ("linear", "relu", "softmax")
+PARITY_TOLERANCE = 1e-4
+# From most precise to most compact.
+PRECISIONS = ("float32", "float16", "int8")
+# Budget for float32 copies of the weights of recently used compact models.
+DEQUANTIZED_CACHE_BYTES = int(os.environ.get("DEQUANTIZED_CACHE_BYTES", str(32 * 1024 * 1024)))
+# kNN models with at least this many vectors are served from a KD-tree; below
+# it brute force is faster.
+KNN_TREE_MIN_SAMPLES = int(os.environ.get("KNN_TREE_MIN_SAMPLES", "5000"))
+
+
+def _apply_activation(X, activation):
+    if activation == "relu":
+        return np.maximum(X, 0, out=X)
+    if activation == "softmax":
+        X -= X.max(axis=1, keepdims=True)
+        np.exp(X, out=X)
+        X /= X.sum(axis=1, keepdims=True)
+    return X
+
+
+def _preprocess_landmarks(model, landmarks):
+    frame = np.asarray(landmarks, dtype=np.float64).reshape(1, -1, 3)
+    return preprocess_frames(frame, model.input_pipeline, model.input_dim)[0]
+
+
+class DequantizedWeights:
+    """LRU of float32 weight matrices of compact models, int8 scales folded in.
+
+    Compact models stay compact in the model cache; only the ones in use get
+    a float32 working copy, made once instead of on every call, so they run
+    at float32 speed.
+    """
+
+    def __init__(self, max_bytes: int = DEQUANTIZED_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+    def get(self, model):
+        with self._lock:
+            weights = self._entries.get(model)
+            if weights is not None:
+                self._entries.move_to_end(model)
+                return weights
+
+        weights = [
+            W.astype(np.float32) * scale if scale is not None else W.astype(np.float32)
+            for W, scale in zip(model.weights, model.scales)
+        ]
+        nbytes = sum(W.nbytes for W in weights)
+        with self._lock:
+            if model not in self._entries and nbytes <= self.max_bytes:
+                self._entries[model] = weights
+                self.total_bytes += nbytes
+                while self.total_bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.total_bytes -= sum(W.nbytes for W in evicted)
+        return weights
+
+    def discard(self, model):
+        with self._lock:
+            weights = self._entries.pop(model, None)
+            if weights is not None:
+                self.total_bytes -= sum(W.nbytes for W in weights)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"models": len(self._entries), "bytes": self.total_bytes, "max_bytes": self.max_bytes}
+
+
+dequantized_weights = DequantizedWeights()
+
+
+class NumpySignModel:
+    def __init__(self, weights, biases, activations, input_dim: int,
+                 input_pipeline: str = DEFAULT_INPUT_PIPELINE, scales=None):
+        self.weights = weights
+        self.biases = biases
+        # Per-output-column scales of int8 weights; None for float layers.
+        self.scales = scales or [None] * len(weights)
+        self.activations = activations
+        self.input_dim = input_dim
+        self.input_pipeline = input_pipeline
+        self.num_classes = weights[-1].shape[1]
+
+    @property
+    def precision(self) -> str:
+        return str(self.weights[0].dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            W.nbytes + b.nbytes + (scale.nbytes if scale is not None else 0)
+            for W, b, scale in zip(self.weights, self.biases, self.scales)
+        )
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        weights = self.weights if self.precision == "float32" else dequantized_weights.get(self)
+        for W, b, activation in zip(weights, self.biases, self.activations):
+            Z = X @ W
+            Z += b
+            X = _apply_activation(Z, activation)
+        return X
+
+    def preprocess_landmarks(self, landmarks):
+        return _preprocess_landmarks(self, landmarks)
+
+    def to_arrays(self) -> dict:
+        arrays = {
+            "input_dim": np.array(self.input_dim),
+            "input_pipeline": np.array(self.input_pipeline),
+            "activations": np.array(self.activations)
+        }
+        for i, (W, b, scale) in enumerate(zip(self.weights, self.biases, self.scales)):
+            arrays[f"W{i}"] = W
+            arrays[f"b{i}"] = b
+            if scale is not None:
+                arrays[f"s{i}"] = scale
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        activations = [str(activation) for activation in arrays["activations"]]
+        weights = [arrays[f"W{i}"] for i in range(len(activations))]
+        biases = [arrays[f"b{i}"] for i in range(len(activations))]
+        scales = [arrays[f"s{i}"] if f"s{i}" in arrays else None for i in range(len(activations))]
+        input_dim = int(arrays["input_dim"])
+        input_pipeline = str(arrays["input_pipeline"]) if "input_pipeline" in arrays else DEFAULT_INPUT_PIPELINE
+        return cls(weights, biases, activations, input_dim, input_pipeline, scales)
+
+    def save(self, filepath):
+        np.savez(filepath, **self.to_arrays())
+
+    @classmethod
+    def load(cls, filepath):
+        with np.load(filepath) as data:
+            return cls.from_arrays(data)
+
+
+class KNNSignModel:
+    """k-nearest-neighbour classifier over stored preprocessed training vectors.
+
+    Class probabilities are the neighbours' vote shares, as with scikit-learn's
+    uniform weighting. Up to KNN_TREE_MIN_SAMPLES vectors, distances are
+    computed by brute force with one matrix product, which is faster than
+    walking a tree and keeps scikit-learn out of the serving path. Larger
+    models are indexed with a KD-tree, built when the model is fitted or
+    loaded, since the brute-force cost grows with every sample.
+    """
+
+    precision = "float32"
+
+    def __init__(self, X, labels, num_classes: int, k: int, input_dim: int,
+                 input_pipeline: str = DEFAULT_INPUT_PIPELINE):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.num_classes = num_classes
+        self.k = max(1, min(k, len(X)))
+        self.input_dim = input_dim
+        self.input_pipeline = input_pipeline
+
+        if len(X) >= KNN_TREE_MIN_SAMPLES:
+            from sklearn.neighbors import KDTree
+
+            # The tree keeps its own copy of the vectors, so X is not kept.
+            self.tree = KDTree(X)
+            self.X = None
+            self.squared_norms = None
+        else:
+            self.tree = None
+            self.X = X
+            self.squared_norms = np.einsum("ij,ij->i", X, X)
+
+    @property
+    def nbytes(self) -> int:
+        if self.tree is not None:
+            return self.labels.nbytes + sum(np.asarray(array).nbytes for array in self.tree.get_arrays())
+        return self.X.nbytes + self.labels.nbytes + self.squared_norms.nbytes
+
+    def _neighbours(self, X):
+        if self.tree is not None:
+            return self.tree.query(X, k=self.k, return_distance=False)
+        # The query's own squared norm is the same for every neighbour, so it
+        # is left out of the ranking.
+        distances = self.squared_norms - 2.0 * (X @ self.X.T)
+        return np.argpartition(distances, self.k - 1, axis=1)[:, :self.k]
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        neighbours = self._neighbours(X)
+
+        probabilities = np.zeros((len(X), self.num_classes), dtype=np.float32)
+        np.add.at(probabilities, (np.arange(len(X))[:, np.newaxis], self.labels[neighbours]), 1.0 / self.k)
+        return probabilities
+
+    def preprocess_landmarks(self, landmarks):
+        return _preprocess_landmarks(self, landmarks)
+
+    def to_arrays(self) -> dict:
+        return {
+            "backend": np.array("knn"),
+            "X": self.X if self.tree is None else np.asarray(self.tree.data, dtype=np.float32),
+            "labels": self.labels,
+            "num_classes": np.array(self.num_classes),
+            "k": np.array(self.k),
+            "input_dim": np.array(self.input_dim),
+            "input_pipeline": np.array(self.input_pipeline)
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(
+            arrays["X"], arrays["labels"], int(arrays["num_classes"]), int(arrays["k"]),
+            int(arrays["input_dim"]), str(arrays["input_pipeline"])
+        )
+
+    def save(self, filepath):
+        np.savez(filepath, **self.to_arrays())
+
+    @classmethod
+    def load(cls, filepath):
+        with np.load(filepath) as data:
+            return cls.from_arrays(data)
+
+
+def runtime_model_from_arrays(arrays):
+    backend = str(arrays["backend"]) if "backend" in arrays else "mlp"
+    if backend == "knn":
+        return KNNSignModel.from_arrays(arrays)
+    return NumpySignModel.from_arrays(arrays)
+
+
+def load_runtime_model(filepath):
+    with np.load(filepath) as data:
+        return runtime_model_from_arrays(data)
+
+
+def quantize_model(model: NumpySignModel, precision: str) -> NumpySignModel:
+    """Return a copy of a float32 model with its weight matrices stored in a
+    compact precision. Biases stay float32; int8 uses symmetric per-column scales."""
+    if precision == "float32":
+        return model
+    if precision == "float16":
+        weights = [W.astype(np.float16) for W in model.weights]
+        scales = None
+    elif precision == "int8":
+        weights, scales = [], []
+        for W in model.weights:
+            scale = np.abs(W).max(axis=0) / 127.0
+            scale[scale == 0] = 1.0
+            weights.append(np.round(W / scale).astype(np.int8))
+            scales.append(scale.astype(np.float32))
+    else:
+        raise ValueError(f"Unknown precision: {precision}")
+
+    return NumpySignModel(
+        weights, list(model.biases), list(model.activations), model.input_dim, model.input_pipeline, scales
+    )
+
+
+def quantize_variants(model: NumpySignModel, precisions, X_val, y_val):
+    """Build the compact variants of model and report their validation accuracy
+    next to the float32 model's. Returns the report and the variants by precision."""
+    X_val = np.asarray(X_val, dtype=np.float32)
+    labels = np.argmax(y_val, axis=1)
+    reference = np.argmax(model.predict(X_val), axis=1)
+    reference_accuracy = float(np.mean(reference == labels)) if len(labels) else None
+
+    report = {"float32": {"val_accuracy": reference_accuracy, "bytes": model.nbytes}}
+    variants = {}
+    for precision in precisions:
+        compact = quantize_model(model, precision)
+        predicted = np.argmax(compact.predict(X_val), axis=1)
+        dequantized_weights.discard(compact)
+        accuracy = float(np.mean(predicted == labels)) if len(labels) else None
+        variants[precision] = compact
+        report[precision] = {
+            "val_accuracy": accuracy,
+            "accuracy_loss": reference_accuracy - accuracy if accuracy is not None else None,
+            "agreement": float(np.mean(predicted == reference)) if len(labels) else None,
+            "bytes": compact.nbytes,
+        }
+    return report, variants
+
+
+def _batchnorm_affine(layer):
+    config = layer.get_config()
+    params = iter(layer.get_weights())
+    gamma = next(params) if config.get("scale", True) else None
+    beta = next(params) if config.get("center", True) else None
+    moving_mean = next(params)
+    moving_variance = next(params)
+
+    scale = 1.0 / np.sqrt(moving_variance + config["epsilon"])
+    if gamma is not None:
+        scale = scale * gamma
+    shift = -moving_mean * scale
+    if beta is not None:
+        shift = shift + beta
+    return scale, shift
+
+
+def fold_keras_model(keras_model, input_pipeline: str = DEFAULT_INPUT_PIPELINE):
+    weights, biases, activations = [], [], []
+    pending = None
+
+    for layer in keras_model.layers:
+        kind = layer.__class__.__name__
+
+        if kind == "Dense":
+            W, b = (np.asarray(p, dtype=np.float64) for p in layer.get_weights())
+            if pending is not None:
+                # A BatchNorm placed after an activation cannot be folded backwards
+                # through the nonlinearity, so it is folded into this Dense instead.
+                scale, shift = pending
+                b = shift @ W + b
+                W = scale[:, np.newaxis] * W
+                pending = None
+
+            activation = layer.get_config()["activation"]
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation for NumPy export: {activation}")
+            weights.append(W)
+            biases.append(b)
+            activations.append(activation)
+
+        elif kind == "BatchNormalization":
+            scale, shift = _batchnorm_affine(layer)
+            if weights and activations[-1] == "linear" and pending is None:
+                weights[-1] = weights[-1] * scale
+                biases[-1] = biases[-1] * scale + shift
+            elif pending is not None:
+                pending = (pending[0] * scale, pending[1] * scale + shift)
+            else:
+                pending = (scale, shift)
+
+        elif kind not in ("Dropout", "InputLayer"):
+            raise ValueError(f"Unsupported layer for NumPy export: {kind}")
+
+    if pending is not None:
+        raise ValueError("Cannot fold a trailing BatchNormalization layer")
+
+    input_dim = weights[0].shape[0]
+    return NumpySignModel(
+        [W.astype(np.float32) for W in weights],
+        [b.astype(np.float32) for b in biases],
+        activations,
+        input_dim,
+        input_pipeline
+    )
+
+
+def fold_and_verify(keras_model, X_check, input_pipeline: str = DEFAULT_INPUT_PIPELINE):
+    numpy_model = fold_keras_model(keras_model, input_pipeline)
+
+    X_check = np.asarray(X_check, dtype=np.float32)
+    expected = keras_model.predict_on_batch(X_check)
+    max_error = float(np.max(np.abs(numpy_model.predict(X_check) - expected)))
+    if max_error > PARITY_TOLERANCE:
+        raise ValueError(f"NumPy export does not match Keras model (max error {max_error:.2e})")
+
+    return numpy_model, max_error
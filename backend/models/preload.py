@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+from .inference import inference_engine
+from .model_cache import model_cache
+import numpy as np
+import os
+import threading
+import time
+
+# Comma-separated model ids to load at startup, "all" for every trained model,
+# or empty to load models on first use.
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "all").strip()
+PRELOAD_WORKERS = int(os.environ.get("PRELOAD_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def preload_model_ids(trained_ids, setting: str = PRELOAD_MODELS):
+    if not setting:
+        return []
+    if setting.lower() == "all":
+        # More than the cache holds would only evict the first ones again.
+        return sorted(trained_ids)[:model_cache.max_models]
+    return [model_id.strip() for model_id in setting.split(",") if model_id.strip()]
+
+
+def warm_model(model_id: str) -> bool:
+    """Load a model into the cache and run one inference so the first request
+    finds it resident, with its batcher thread started and any graph traced."""
+    entry = model_cache.get(model_id)
+    if entry is None:
+        return False
+
+    features = np.zeros(entry.metadata['input_dim'], dtype=np.float32)
+    inference_engine.predict(model_id, entry.model, features)
+    return True
+
+
+def _preload(model_id: str, log):
+    try:
+        if warm_model(model_id):
+            return True
+        log(f"Could not preload model {model_id}: no trained artifact")
+    except Exception as e:
+        log(f"Could not preload model {model_id}: {e}")
+    return False
+
+
+def preload_models(model_ids, workers: int = PRELOAD_WORKERS, log=print) -> int:
+    """Load and warm models on a small thread pool. File reads, page faults on
+    mapped weights, checksums and the warm-up matmul release the GIL, so loads
+    overlap; more workers than the cache holds would only evict each other."""
+    model_ids = list(model_ids)
+    workers = max(1, min(workers, model_cache.max_models, len(model_ids) or 1))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="model-preload") as executor:
+        loaded = sum(executor.map(lambda model_id: _preload(model_id, log), model_ids))
+    log(f"Preloaded {loaded}/{len(model_ids)} models in {time.perf_counter() - start:.2f}s")
+    return loaded
+
+
+def start_preload(model_ids) -> threading.Thread:
+    """Warm models in a background thread so startup is not delayed."""
+    thread = threading.Thread(
+        target=preload_models, args=(list(model_ids),), name="model-preload", daemon=True
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,98 @@
+from itertools import chain
+from .hand_features import HAND_FEATURE_DIM, hand_features_packed
+import numpy as np
+
+MAX_POINTS = 42
+CHUNK_SIZE = 8192
+
+DEFAULT_INPUT_PIPELINE = "landmarks"
+INPUT_PIPELINES = ("landmarks", "hand_features")
+
+
+def normalize_rows(X):
+    mean = X.mean(axis=1, keepdims=True)
+    std = X.std(axis=1, keepdims=True)
+    np.subtract(X, mean, out=X, where=std > 0)
+    np.divide(X, std, out=X, where=std > 0)
+    return X
+
+
+def preprocess_packed(points, counts, input_dim: int = 126, chunk_size: int = CHUNK_SIZE):
+    flat = np.asarray(points).reshape(-1)
+    counts = np.asarray(counts, dtype=np.int64)
+    num_samples = len(counts)
+
+    if flat.size != counts.sum() * 3:
+        raise ValueError("Point counts do not match the packed landmark buffer")
+
+    offsets = np.zeros(num_samples, dtype=np.int64)
+    np.cumsum(counts[:-1] * 3, out=offsets[1:])
+    used = np.minimum(counts, MAX_POINTS)
+    widths = np.minimum(used * 3, input_dim)
+
+    X = np.empty((num_samples, input_dim), dtype=np.float32)
+
+    # Normalization runs in float64 on bounded chunks so the result matches
+    # preprocess_landmarks bit for bit without a full float64 copy of X.
+    for start in range(0, num_samples, chunk_size):
+        stop = min(start + chunk_size, num_samples)
+        chunk_widths = widths[start:stop]
+        total = int(chunk_widths.sum())
+
+        row_starts = np.cumsum(chunk_widths) - chunk_widths
+        rows = np.repeat(np.arange(stop - start), chunk_widths)
+        cols = np.arange(total) - np.repeat(row_starts, chunk_widths)
+
+        scratch = np.zeros((stop - start, input_dim), dtype=np.float64)
+        scratch[rows, cols] = flat[np.repeat(offsets[start:stop], chunk_widths) + cols]
+        X[start:stop] = normalize_rows(scratch)
+
+    return X
+
+
+def pack_landmark_sets(landmark_sets):
+    counts = np.fromiter((len(landmarks) for landmarks in landmark_sets), dtype=np.int64)
+    try:
+        points = np.fromiter(
+            chain.from_iterable(chain.from_iterable(landmark_sets)), dtype=np.float64
+        )
+        if points.size == counts.sum() * 3:
+            return points.reshape(-1, 3), counts
+    except (TypeError, ValueError):
+        pass
+
+    # Samples sent as flat [x, y, z, x, y, z, ...] lists take the slow path.
+    arrays = [np.asarray(landmarks, dtype=np.float64).reshape(-1, 3) for landmarks in landmark_sets]
+    counts = np.array([len(array) for array in arrays], dtype=np.int64)
+    points = np.concatenate(arrays) if arrays else np.empty((0, 3))
+    return points, counts
+
+
+def preprocess_landmark_sets(landmark_sets, input_dim: int = 126):
+    points, counts = pack_landmark_sets(landmark_sets)
+    return preprocess_packed(points, counts, input_dim)
+
+
+def pipeline_input_dim(pipeline: str, input_dim: int = 126) -> int:
+    if pipeline == "hand_features":
+        return HAND_FEATURE_DIM
+    if pipeline == "landmarks":
+        return input_dim
+    raise ValueError(f"Unknown input pipeline: {pipeline}")
+
+
+def preprocess_pipeline(points, counts, pipeline: str = DEFAULT_INPUT_PIPELINE, input_dim: int = 126):
+    if pipeline == "hand_features":
+        return hand_features_packed(points, counts)
+    if pipeline == "landmarks":
+        return preprocess_packed(points, counts, input_dim)
+    raise ValueError(f"Unknown input pipeline: {pipeline}")
+
+
+def preprocess_frames(frames, pipeline: str = DEFAULT_INPUT_PIPELINE, input_dim: int = 126):
+    frames = np.asarray(frames)
+    if frames.ndim != 3 or frames.shape[2] != 3:
+        raise ValueError("Frames must have shape (frames, points, 3)")
+
+    counts = np.full(frames.shape[0], frames.shape[1], dtype=np.int64)
+    return preprocess_pipeline(frames, counts, pipeline, input_dim)
@@ -3,91 +3,233 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 from tensorflow.keras.utils import to_categorical
 from .model import SignRecognitionModel
+from .numpy_runtime import fold_and_verify, quantize_variants
+from .artifacts import write_version
+from .preprocessing import DEFAULT_INPUT_PIPELINE, pack_landmark_sets, preprocess_pipeline
+from .augmentation import AugmentedSequence
+from .model_cache import current_keras_path, legacy_artifact_paths
+from .backends import AUTO_CANDIDATES, AUTO_MAX_SAMPLES, AUTO_TARGET_ACCURACY, accuracy, fit_backend
 import os
-import json
 
 class ModelTrainer:
-    def __init__(self, model_id: str):
+    def __init__(self, model_id: str, input_pipeline: str = DEFAULT_INPUT_PIPELINE):
         self.model_id = model_id
+        self.input_pipeline = input_pipeline
         self.training_data = []
         self.labels = []
+        self.packed_points = []
+        self.packed_counts = []
+        self.packed_labels = []
+        self.feature_blocks = []
+        self.feature_labels = []
         self.label_encoder = LabelEncoder()
+        self.classes = []
 
     def add_sample(self, landmarks, sign):
         if len(landmarks) > 0:
             self.training_data.append(landmarks)
             self.labels.append(sign)
 
-    def prepare_data(self):
-        if not self.training_data:
-            raise ValueError("No training data available")
+    def add_samples(self, points, counts, signs):
+        counts = np.asarray(counts, dtype=np.int64)
+        keep = counts > 0
+        
+        self.packed_points.append(np.asarray(points).reshape(-1, 3))
+        self.packed_counts.append(counts[keep])
+        self.packed_labels.extend(sign for sign, kept in zip(signs, keep) if kept)
+
+    def add_features(self, X, signs):
+        self.feature_blocks.append(np.asarray(X, dtype=np.float32))
+        self.feature_labels.extend(signs)
+
+    @property
+    def num_samples(self) -> int:
+        return len(self.feature_labels) + len(self.packed_labels) + len(self.labels)
 
-        X = []
-        for landmarks in self.training_data:
-            model = SignRecognitionModel(len(set(self.labels)))
-            processed = model.preprocess_landmarks(landmarks)
-            X.append(processed)
+    def all_labels(self):
+        return self.feature_labels + self.packed_labels + self.labels
 
-        X = np.array(X)
+    def prepare_data(self, classes=None):
+        if self.num_samples == 0:
+            raise ValueError("No training data available")
+
+        blocks = list(self.feature_blocks)
+        if self.packed_labels or self.labels:
+            points, counts = pack_landmark_sets(self.training_data)
+            X = preprocess_pipeline(
+                np.concatenate(self.packed_points + [points]),
+                np.concatenate(self.packed_counts + [counts]),
+                self.input_pipeline
+            )
+            blocks.append(X)
+        X = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+        labels = self.all_labels()
         
-        self.label_encoder.fit(self.labels)
-        y_encoded = self.label_encoder.transform(self.labels)
-        y = to_categorical(y_encoded)
+        if classes is None:
+            self.label_encoder.fit(labels)
+            self.classes = self.label_encoder.classes_.tolist()
+            y_encoded = self.label_encoder.transform(labels)
+        else:
+            self.classes = list(classes)
+            class_index = {sign: i for i, sign in enumerate(self.classes)}
+            y_encoded = np.array([class_index[label] for label in labels])
+        y = to_categorical(y_encoded, num_classes=len(self.classes))
 
         return X, y
 
-    def augment_data(self, X, y, augmentation_factor=3):
-        augmented_X = []
-        augmented_y = []
+    def split_data(self, X, y, test_size=0.2, random_state=42):
+        labels = np.argmax(y, axis=1)
+        class_counts = np.bincount(labels)
+        stratify = labels if class_counts[class_counts > 0].min() >= 2 else None
         
-        for i in range(len(X)):
-            augmented_X.append(X[i])
-            augmented_y.append(y[i])
-            
-            for _ in range(augmentation_factor):
-                noise = np.random.normal(0, 0.01, X[i].shape)
-                augmented_sample = X[i] + noise
-                augmented_X.append(augmented_sample)
-                augmented_y.append(y[i])
-                
-                scale = np.random.uniform(0.95, 1.05)
-                scaled_sample = X[i] * scale
-                augmented_X.append(scaled_sample)
-                augmented_y.append(y[i])
-        
-        return np.array(augmented_X), np.array(augmented_y)
+        return train_test_split(
+            X, y, test_size=test_size, random_state=random_state, stratify=stratify
+        )
 
-    def train_model(self, epochs=100):
+    def augment_data(self, X, y, augmentation_factor=3, seed=42):
+        return AugmentedSequence(X, y, augmentation_factor=augmentation_factor, seed=seed)
+
+    def train_model(self, epochs=100, callbacks=None, last_sample_seq=None, backend="mlp"):
         X, y = self.prepare_data()
         
-        X_augmented, y_augmented = self.augment_data(X, y)
-        
-        X_train, X_val, y_train, y_val = train_test_split(
-            X_augmented, y_augmented, test_size=0.2, random_state=42, stratify=y_augmented
-        )
+        X_train, X_val, y_train, y_val = self.split_data(X, y)
+
+        selection = {}
+        if backend != "mlp":
+            candidates = (backend,) if backend != "auto" else (
+                AUTO_CANDIDATES if len(X) <= AUTO_MAX_SAMPLES else ()
+            )
+            for candidate in candidates:
+                if self.train_backend(
+                    candidate, X, y, X_train, X_val, y_train, y_val, selection,
+                    required_accuracy=AUTO_TARGET_ACCURACY if backend == "auto" else None,
+                    last_sample_seq=last_sample_seq
+                ):
+                    return None
 
-        num_classes = len(self.label_encoder.classes_)
-        input_dim = X.shape[1]
+        train_sequence = self.augment_data(X_train, y_train)
 
-        model = SignRecognitionModel(num_classes, input_dim)
+        model = SignRecognitionModel(len(self.classes), X.shape[1], self.input_pipeline)
         model.build_model()
 
-        history = model.train(X_train, y_train, X_val, y_val, epochs)
+        history = model.train(train_sequence, None, X_val, y_val, epochs, callbacks)
+
+        self.save_artifacts(model, X_val, y_val, {
+            "training_mode": "full",
+            "training_samples": self.num_samples,
+            "augmented_samples": train_sequence.num_samples,
+            "validation_samples": len(X_val),
+            "last_sample_seq": last_sample_seq,
+            "backend_selection": selection
+        })
+
+        return history
+
+    def train_backend(self, backend, X, y, X_train, X_val, y_train, y_val, selection,
+                      required_accuracy=None, last_sample_seq=None) -> bool:
+        """Fit a lightweight backend and save it if its validation accuracy
+        reaches required_accuracy (always, when None). Returns whether it did."""
+        labels_train = np.argmax(y_train, axis=1)
+        labels_val = np.argmax(y_val, axis=1)
+
+        try:
+            model = fit_backend(backend, X_train, labels_train, len(self.classes), self.input_pipeline)
+        except ValueError as e:
+            if required_accuracy is None:
+                raise
+            print(f"Backend {backend} skipped for model {self.model_id}: {e}")
+            return False
+
+        val_accuracy = accuracy(model, X_val, labels_val)
+        selection[backend] = val_accuracy
+        if required_accuracy is not None and (val_accuracy is None or val_accuracy < required_accuracy):
+            return False
+
+        # The validation split only served to judge the backend; the saved
+        # model is refit on every sample.
+        model = fit_backend(backend, X, np.argmax(y, axis=1), len(self.classes), self.input_pipeline)
+        self.save_backend_artifacts(model, backend, {
+            "training_mode": "full",
+            "training_samples": self.num_samples,
+            "validation_samples": len(X_val),
+            "val_accuracy": val_accuracy,
+            "last_sample_seq": last_sample_seq,
+            "backend_selection": selection
+        })
+        return True
+
+    def train_incremental(self, base_metadata, epochs=20, learning_rate=1e-4, callbacks=None,
+                          last_sample_seq=None):
+        base_classes = base_metadata["classes"]
+        new_classes = sorted(set(self.all_labels()) - set(base_classes))
+
+        X, y = self.prepare_data(base_classes + new_classes)
+        
+        X_train, X_val, y_train, y_val = self.split_data(X, y)
+        train_sequence = self.augment_data(X_train, y_train)
+
+        model = SignRecognitionModel(len(base_classes), base_metadata["input_dim"], self.input_pipeline)
+        model.load(current_keras_path(self.model_id))
+        model.expand_output(len(self.classes))
+        model.compile(learning_rate)
+
+        history = model.train(train_sequence, None, X_val, y_val, epochs, callbacks)
+
+        self.save_artifacts(model, X_val, y_val, {
+            "training_mode": "incremental",
+            "training_samples": self.num_samples,
+            "new_classes": new_classes,
+            "augmented_samples": train_sequence.num_samples,
+            "validation_samples": len(X_val),
+            "last_sample_seq": last_sample_seq
+        })
+
+        return history
+
+    def save_artifacts(self, model, X_val, y_val, extra_metadata):
+        try:
+            numpy_model, numpy_parity_error = fold_and_verify(model.model, X_val, self.input_pipeline)
+            quantized, compact = quantize_variants(numpy_model, ("float16", "int8"), X_val, y_val)
+            variants = {"float32": numpy_model.to_arrays()}
+            variants.update({precision: variant.to_arrays() for precision, variant in compact.items()})
+        except ValueError as e:
+            # Without a NumPy export the version carries only the Keras model.
+            print(f"NumPy export failed for model {self.model_id}: {e}")
+            numpy_parity_error = None
+            quantized = {}
+            variants = {}
+
+        metadata = {
+            "classes": self.classes,
+            "input_dim": model.input_dim,
+            "input_pipeline": self.input_pipeline,
+            "num_classes": len(self.classes),
+            "backend": "mlp",
+            "numpy_parity_error": numpy_parity_error,
+            "quantized": quantized
+        }
+        metadata.update(extra_metadata)
 
-        model_path = f"storage/models/{self.model_id}.h5"
-        os.makedirs(os.path.dirname(model_path), exist_ok=True)
-        model.save(model_path)
+        write_version(self.model_id, variants, metadata, keras_model=model)
+        self.remove_legacy_artifacts()
 
+    def save_backend_artifacts(self, model, backend, extra_metadata):
         metadata = {
-            "classes": self.label_encoder.classes_.tolist(),
-            "input_dim": input_dim,
-            "num_classes": num_classes,
-            "training_samples": len(self.training_data),
-            "augmented_samples": len(X_augmented)
+            "classes": self.classes,
+            "input_dim": model.input_dim,
+            "input_pipeline": self.input_pipeline,
+            "num_classes": len(self.classes),
+            "backend": backend,
+            "numpy_parity_error": None,
+            "quantized": {}
         }
+        metadata.update(extra_metadata)
 
-        metadata_path = f"storage/models/{self.model_id}_metadata.json"
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f)
+        write_version(self.model_id, {"float32": model.to_arrays()}, metadata)
+        self.remove_legacy_artifacts()
 
-        return history
\ No newline at end of file
+    def remove_legacy_artifacts(self):
+        # Once a versioned artifact exists the old flat files are never read again.
+        for path in legacy_artifact_paths(self.model_id).values():
+            if os.path.exists(path):
+                os.remove(path)
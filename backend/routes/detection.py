@@ -1,16 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from concurrent.futures import Future
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List
-from database.database import get_db
-from database.models import Model as ModelDB
-from models.model import SignRecognitionModel
+from typing import List, Optional
+from database.registry import model_registry
+from models.model_cache import artifact_exists, model_cache
+from models.inference import inference_engine
+from models.preload import preload_model_ids, start_preload
+from models.motion_gate import motion_gate
+from models.preprocessing import pack_landmark_sets, preprocess_frames, preprocess_pipeline
+from utils.smoothing import TemporalSmoother, SMOOTHING_MODES
+from utils.tracking_pool import tracking_pool, TrackingPoolBusy
+from utils.metrics import stage_timer
+import asyncio
 import json
 import numpy as np
 import os
+import uuid
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 router = APIRouter()
 
+MAX_BATCH_FRAMES = int(os.environ.get("MAX_BATCH_FRAMES", "4096"))
+MAX_FANOUT_MODELS = int(os.environ.get("MAX_FANOUT_MODELS", "16"))
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack")
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(16 * 1024 * 1024)))
+IMAGE_CONTENT_TYPES = ("image/jpeg", "image/png")
+CLIP_CONTENT_TYPES = {
+    "video/mp4": ".mp4",
+    "video/webm": ".webm",
+    "video/quicktime": ".mov",
+    "video/x-msvideo": ".avi",
+}
+
 class PredictionRequest(BaseModel):
     landmarks: List[List[float]]
 
@@ -18,66 +44,504 @@ class PredictionResponse(BaseModel):
     sign: str
     confidence: float
 
-loaded_models = {}
+class BatchPredictionResponse(BaseModel):
+    predictions: List[PredictionResponse]
+
+class FramePredictionResponse(BaseModel):
+    sign: Optional[str]
+    confidence: float
+    hands: int
+
+class ClipPredictionResponse(BaseModel):
+    sign: Optional[str]
+    confidence: float
+    predictions: List[FramePredictionResponse]
+
+class MultiPredictionRequest(BaseModel):
+    model_ids: List[str]
+    landmarks: List[List[float]]
+    top_k: int = 3
+
+class ModelPredictionResponse(BaseModel):
+    model_id: str
+    predictions: List[PredictionResponse]
+    error: Optional[str] = None
+
+class MultiPredictionResponse(BaseModel):
+    results: List[ModelPredictionResponse]
+
+@router.on_event("startup")
+def preload_configured_models():
+    # Runs after the models router has loaded the registry.
+    model_ids = preload_model_ids(model_registry.trained_ids())
+    if model_ids:
+        start_preload(model_ids)
 
 def load_model_if_needed(model_id: str):
-    if model_id not in loaded_models:
-        model_path = f"storage/models/{model_id}.h5"
-        metadata_path = f"storage/models/{model_id}_metadata.json"
-        
-        if not os.path.exists(model_path) or not os.path.exists(metadata_path):
-            return None, None
-        
-        try:
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
-            
-            model = SignRecognitionModel(metadata['num_classes'], metadata['input_dim'])
-            model.load(model_path)
-            
-            loaded_models[model_id] = {
-                'model': model,
-                'classes': metadata['classes']
-            }
-        except Exception as e:
-            print(f"Error loading model {model_id}: {e}")
-            return None, None
+    entry = model_cache.get(model_id)
+    if entry is None:
+        return None, None
     
-    return loaded_models[model_id]['model'], loaded_models[model_id]['classes']
+    return entry.model, entry.classes
 
-@router.post("/{model_id}/predict", response_model=PredictionResponse)
-def predict_sign(
-    model_id: str,
-    prediction_request: PredictionRequest,
-    db: Session = Depends(get_db)
-):
-    db_model = db.query(ModelDB).filter(ModelDB.id == model_id).first()
-    if not db_model:
+def get_trained_model(model_id: str, route: str = "predict"):
+    with stage_timer(route, "model_check"):
+        is_trained = model_registry.status(model_id)
+    if is_trained is None:
         raise HTTPException(status_code=404, detail="Model not found")
     
-    if not db_model.is_trained:
+    if not is_trained:
         raise HTTPException(status_code=400, detail="Model is not trained yet")
     
-    model, classes = load_model_if_needed(model_id)
+    with stage_timer(route, "model_load"):
+        model, classes = load_model_if_needed(model_id)
     if model is None:
+        if not artifact_exists(model_id):
+            # Deleted, most likely through another API process; re-reading
+            # the database drops the stale registry entry.
+            if model_registry.refresh(model_id) is None:
+                raise HTTPException(status_code=404, detail="Model not found")
+            raise HTTPException(status_code=404, detail="Trained model artifacts not found")
         raise HTTPException(status_code=500, detail="Failed to load trained model")
     
+    return model, classes
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    return model_cache.stats()
+
+@router.get("/gate/stats")
+def get_gate_stats():
+    return motion_gate.stats()
+
+def client_key(request: Request):
+    # Clients can name themselves so several cameras behind one address keep
+    # separate motion-gate state.
+    if request is None:
+        return None
+    return request.headers.get("x-client-id") or (request.client.host if request.client else None)
+
+@router.post("/{model_id}/predict", response_model=PredictionResponse)
+def predict_sign(model_id: str, prediction_request: PredictionRequest, request: Request = None):
+    model, classes = get_trained_model(model_id)
+    
     try:
         if len(prediction_request.landmarks) == 0:
             raise HTTPException(status_code=400, detail="No landmarks provided")
         
-        processed_landmarks = model.preprocess_landmarks(prediction_request.landmarks)
-        prediction = model.predict(np.array([processed_landmarks]))
+        with stage_timer("predict", "preprocess"):
+            processed_landmarks = model.preprocess_landmarks(prediction_request.landmarks)
+        with stage_timer("predict", "gate"):
+            client = client_key(request)
+            prediction = motion_gate.lookup(client, model_id, model, processed_landmarks)
+        if prediction is None:
+            with stage_timer("predict", "inference"):
+                prediction = inference_engine.predict(model_id, model, processed_landmarks)
+            motion_gate.store(client, model_id, model, processed_landmarks, prediction)
+        
+        with stage_timer("predict", "serialize"):
+            predicted_class_index = np.argmax(prediction)
+            confidence = float(prediction[predicted_class_index])
+            predicted_sign = classes[predicted_class_index]
+            
+            return PredictionResponse(
+                sign=predicted_sign,
+                confidence=confidence
+            )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+def top_predictions(prediction, classes, top_k: int):
+    top_k = max(1, min(top_k, len(classes)))
+    indices = np.argpartition(prediction, len(prediction) - top_k)[-top_k:]
+    indices = indices[np.argsort(prediction[indices])[::-1]]
+    return [PredictionResponse(sign=classes[index], confidence=float(prediction[index])) for index in indices]
+
+@router.post("/predict/multi", response_model=MultiPredictionResponse)
+def predict_sign_multi(multi_request: MultiPredictionRequest, request: Request = None):
+    model_ids = list(dict.fromkeys(multi_request.model_ids))
+    if not model_ids:
+        raise HTTPException(status_code=400, detail="No models provided")
+    if len(model_ids) > MAX_FANOUT_MODELS:
+        raise HTTPException(status_code=400, detail=f"Too many models. Maximum per request: {MAX_FANOUT_MODELS}")
+    if len(multi_request.landmarks) == 0:
+        raise HTTPException(status_code=400, detail="No landmarks provided")
+    
+    try:
+        frame = np.asarray(multi_request.landmarks, dtype=np.float64).reshape(1, -1, 3)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Landmarks must be a list of [x, y, z] points")
+    
+    results = {}
+    loaded = {}
+    for model_id in model_ids:
+        try:
+            loaded[model_id] = get_trained_model(model_id, "predict_multi")
+        except HTTPException as e:
+            results[model_id] = ModelPredictionResponse(model_id=model_id, predictions=[], error=e.detail)
+    
+    try:
+        # Models sharing an input pipeline share one preprocessed vector.
+        with stage_timer("predict_multi", "preprocess"):
+            features = {}
+            for model, _ in loaded.values():
+                key = (model.input_pipeline, model.input_dim)
+                if key not in features:
+                    features[key] = preprocess_frames(frame, model.input_pipeline, model.input_dim)[0]
+        
+        # Each model's batcher runs on its own thread, so submitting all of them
+        # before waiting keeps the latency close to the slowest model.
+        with stage_timer("predict_multi", "inference"):
+            client = client_key(request)
+            pending = {}
+            for model_id, (model, _) in loaded.items():
+                vector = features[(model.input_pipeline, model.input_dim)]
+                prediction = motion_gate.lookup(client, model_id, model, vector)
+                pending[model_id] = prediction if prediction is not None else inference_engine.submit(model_id, model, vector)
+            
+            predictions = {}
+            for model_id, (model, _) in loaded.items():
+                if not isinstance(pending[model_id], Future):
+                    predictions[model_id] = pending[model_id]
+                    continue
+                try:
+                    predictions[model_id] = pending[model_id].result()
+                except Exception as e:
+                    print(f"Prediction error for model {model_id}: {e}")
+                    results[model_id] = ModelPredictionResponse(
+                        model_id=model_id, predictions=[], error=f"Prediction failed: {str(e)}"
+                    )
+                    continue
+                vector = features[(model.input_pipeline, model.input_dim)]
+                motion_gate.store(client, model_id, model, vector, predictions[model_id])
+        
+        with stage_timer("predict_multi", "serialize"):
+            for model_id, prediction in predictions.items():
+                results[model_id] = ModelPredictionResponse(
+                    model_id=model_id,
+                    predictions=top_predictions(prediction, loaded[model_id][1], multi_request.top_k)
+                )
+            return MultiPredictionResponse(results=[results[model_id] for model_id in model_ids])
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Multi-model prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+@router.get("/tracking/stats")
+def get_tracking_stats():
+    return tracking_pool.stats()
+
+async def read_upload(request: Request, content_types):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in content_types:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported content type: {content_type}. Expected one of: {', '.join(content_types)}"
+        )
+    
+    body = await read_body(request, MAX_UPLOAD_BYTES)
+    if len(body) == 0:
+        raise HTTPException(status_code=400, detail="Empty upload")
+    
+    return content_type, body
+
+async def read_body(request: Request, limit: int) -> bytes:
+    """Read the request body, refusing it with 413 as soon as it exceeds limit."""
+    too_large = HTTPException(status_code=413, detail=f"Upload too large. Maximum size: {limit} bytes")
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+        raise too_large
+    
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+async def track_hands(route: str, future_factory):
+    try:
+        with stage_timer(route, "tracking"):
+            return await asyncio.wrap_future(future_factory())
+    except TrackingPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def predict_landmark_sets(model, classes, landmark_sets):
+    points, counts = pack_landmark_sets(landmark_sets)
+    hands = np.flatnonzero(counts > 0)
+    
+    probabilities = np.zeros((len(counts), len(classes)), dtype=np.float32)
+    if len(hands) > 0:
+        with stage_timer("predict_clip", "preprocess"):
+            X = preprocess_pipeline(points, counts, model.input_pipeline, model.input_dim)
+        with stage_timer("predict_clip", "inference"):
+            probabilities[hands] = model.predict(X[hands])
+    
+    predictions = []
+    for index, count in enumerate(counts):
+        if count == 0:
+            predictions.append(FramePredictionResponse(sign=None, confidence=0.0, hands=0))
+            continue
+        class_index = int(np.argmax(probabilities[index]))
+        predictions.append(FramePredictionResponse(
+            sign=classes[class_index],
+            confidence=float(probabilities[index, class_index]),
+            hands=int(count // 21)
+        ))
+    
+    if len(hands) == 0:
+        return ClipPredictionResponse(sign=None, confidence=0.0, predictions=predictions)
+    
+    mean_probabilities = probabilities[hands].mean(axis=0)
+    class_index = int(np.argmax(mean_probabilities))
+    return ClipPredictionResponse(
+        sign=classes[class_index],
+        confidence=float(mean_probabilities[class_index]),
+        predictions=predictions
+    )
+
+@router.post("/{model_id}/predict/image", response_model=FramePredictionResponse)
+async def predict_sign_image(model_id: str, request: Request):
+    model, classes = await run_in_threadpool(get_trained_model, model_id, "predict_image")
+    with stage_timer("predict_image", "decode"):
+        _, body = await read_upload(request, IMAGE_CONTENT_TYPES)
+    
+    landmarks = await track_hands("predict_image", lambda: tracking_pool.submit_image(body))
+    if len(landmarks) == 0:
+        return FramePredictionResponse(sign=None, confidence=0.0, hands=0)
+    
+    with stage_timer("predict_image", "preprocess"):
+        processed_landmarks = model.preprocess_landmarks(landmarks)
+    with stage_timer("predict_image", "inference"):
+        prediction = await asyncio.wrap_future(
+            inference_engine.submit(model_id, model, processed_landmarks)
+        )
+    
+    class_index = int(np.argmax(prediction))
+    return FramePredictionResponse(
+        sign=classes[class_index],
+        confidence=float(prediction[class_index]),
+        hands=len(landmarks) // 21
+    )
+
+@router.post("/{model_id}/predict/clip", response_model=ClipPredictionResponse)
+async def predict_sign_clip(model_id: str, request: Request):
+    model, classes = await run_in_threadpool(get_trained_model, model_id, "predict_clip")
+    with stage_timer("predict_clip", "decode"):
+        content_type, body = await read_upload(request, tuple(CLIP_CONTENT_TYPES))
+    
+    frames = await track_hands(
+        "predict_clip", lambda: tracking_pool.submit_clip(body, CLIP_CONTENT_TYPES[content_type])
+    )
+    return await run_in_threadpool(predict_landmark_sets, model, classes, frames)
+
+def frames_from_buffer(buffer: bytes, points: int):
+    if points <= 0:
+        raise HTTPException(status_code=400, detail="Points per frame must be positive")
+    
+    frame_size = points * 3 * 4
+    if len(buffer) == 0 or len(buffer) % frame_size != 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Payload size must be a non-zero multiple of {frame_size} bytes"
+        )
+    
+    return np.frombuffer(buffer, dtype="<f4").reshape(-1, points, 3)
+
+def decode_frames(body: bytes, content_type: str, points: int):
+    if content_type in MSGPACK_CONTENT_TYPES:
+        if msgpack is None:
+            raise HTTPException(status_code=415, detail="msgpack payloads are not supported on this server")
+        
+        try:
+            payload = msgpack.unpackb(body)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid msgpack payload")
+        
+        if not isinstance(payload, dict):
+            raise HTTPException(status_code=400, detail="msgpack payload must be a map")
         
-        predicted_class_index = np.argmax(prediction[0])
-        confidence = float(prediction[0][predicted_class_index])
-        predicted_sign = classes[predicted_class_index]
+        if "data" in payload:
+            data = payload["data"]
+            points = payload.get("points", points)
+            if not isinstance(data, (bytes, bytearray)):
+                raise HTTPException(status_code=400, detail="data must be a binary float32 buffer")
+            if not isinstance(points, int) or isinstance(points, bool):
+                raise HTTPException(status_code=400, detail="points must be an integer")
+            return frames_from_buffer(data, points)
+        
+        try:
+            frames = np.asarray(payload.get("frames", []), dtype=np.float32)
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=400, detail="Frames must be lists of [x, y, z] numbers with the same number of points"
+            )
+        
+        if frames.ndim != 3 or frames.shape[0] == 0 or frames.shape[2] != 3:
+            raise HTTPException(status_code=400, detail="Frames must have shape (frames, points, 3)")
+        return frames
+    
+    if content_type == "application/octet-stream":
+        return frames_from_buffer(body, points)
+    
+    raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+
+def predict_frames(model_id: str, frames):
+    model, classes = get_trained_model(model_id, "predict_batch")
+    
+    try:
+        with stage_timer("predict_batch", "preprocess"):
+            X = preprocess_frames(frames, model.input_pipeline, model.input_dim)
+        with stage_timer("predict_batch", "inference"):
+            predictions = model.predict(X)
         
-        return PredictionResponse(
-            sign=predicted_sign,
-            confidence=confidence
+        with stage_timer("predict_batch", "serialize"):
+            indices = np.argmax(predictions, axis=1)
+            confidences = predictions[np.arange(len(indices)), indices]
+            
+            return BatchPredictionResponse(predictions=[
+                PredictionResponse(sign=classes[index], confidence=float(confidence))
+                for index, confidence in zip(indices, confidences)
+            ])
+    
+    except Exception as e:
+        print(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+@router.post("/{model_id}/predict/batch", response_model=BatchPredictionResponse)
+async def predict_sign_batch(
+    model_id: str,
+    request: Request,
+    points: int = 42
+):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    # Raw buffers can be sized exactly; msgpack carries its own point count
+    # and encoding overhead, so it gets the general upload limit.
+    if content_type == "application/octet-stream":
+        limit = MAX_BATCH_FRAMES * max(points, 1) * 3 * 4
+    else:
+        limit = MAX_UPLOAD_BYTES
+    body = await read_body(request, limit)
+    with stage_timer("predict_batch", "decode"):
+        frames = decode_frames(body, content_type, points)
+    
+    if len(frames) > MAX_BATCH_FRAMES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many frames. Maximum per request: {MAX_BATCH_FRAMES}"
         )
     
+    return await run_in_threadpool(predict_frames, model_id, frames)
+
+def decode_stream_frame(message):
+    if message.get("bytes") is not None:
+        buffer = message["bytes"]
+        if len(buffer) == 0 or len(buffer) % 12 != 0:
+            raise ValueError("Binary frames must be a non-empty float32 buffer of (points, 3)")
+        return np.frombuffer(buffer, dtype="<f4").reshape(-1, 3)
+    
+    payload = json.loads(message.get("text") or "null")
+    if not isinstance(payload, dict):
+        raise ValueError("Text frames must be a JSON object")
+    
+    landmarks = np.asarray(payload.get("landmarks", []), dtype=np.float64)
+    if landmarks.ndim != 2 or landmarks.shape[0] == 0 or landmarks.shape[1] != 3:
+        raise ValueError("Landmarks must be a non-empty list of [x, y, z] points")
+    return landmarks
+
+@router.websocket("/{model_id}/stream")
+async def stream_predictions(
+    websocket: WebSocket,
+    model_id: str,
+    smoothing: str = "majority",
+    window: int = 5,
+    alpha: float = 0.4
+):
+    await websocket.accept()
+    
+    try:
+        if smoothing not in SMOOTHING_MODES:
+            raise HTTPException(status_code=400, detail=f"Smoothing must be one of: {', '.join(SMOOTHING_MODES)}")
+        model, classes = await run_in_threadpool(get_trained_model, model_id, "stream")
+        smoother = TemporalSmoother(len(classes), smoothing, window, alpha)
+    except HTTPException as e:
+        await websocket.send_json({"error": e.detail})
+        await websocket.close(code=1008)
+        return
+    except ValueError as e:
+        await websocket.send_json({"error": str(e)})
+        await websocket.close(code=1008)
+        return
+    
+    current_sign = None
+    frame_index = 0
+    session_key = f"stream-{uuid.uuid4()}"
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            try:
+                with stage_timer("stream", "decode"):
+                    landmarks = decode_stream_frame(message)
+            except ValueError as e:
+                await websocket.send_json({"error": str(e), "frame": frame_index})
+                frame_index += 1
+                continue
+            
+            # Looked up per frame (a cache hit once warm), so a retrain or a
+            # delete reaches open streams too.
+            try:
+                model, latest_classes = await run_in_threadpool(get_trained_model, model_id, "stream")
+            except HTTPException as e:
+                await websocket.send_json({"error": e.detail, "frame": frame_index})
+                await websocket.close(code=1008 if e.status_code < 500 else 1011)
+                break
+            if latest_classes != classes:
+                # A retrain can change the signs, so smoothing starts over.
+                classes = latest_classes
+                smoother = TemporalSmoother(len(classes), smoothing, window, alpha)
+                current_sign = None
+            
+            with stage_timer("stream", "preprocess"):
+                processed_landmarks = preprocess_frames(
+                    landmarks[np.newaxis], model.input_pipeline, model.input_dim
+                )[0]
+            with stage_timer("stream", "gate"):
+                prediction = motion_gate.lookup(session_key, model_id, model, processed_landmarks)
+            if prediction is None:
+                with stage_timer("stream", "inference"):
+                    prediction = await asyncio.wrap_future(
+                        inference_engine.submit(model_id, model, processed_landmarks)
+                    )
+                motion_gate.store(session_key, model_id, model, processed_landmarks, prediction)
+            
+            index, confidence = smoother.update(prediction)
+            if classes[index] != current_sign:
+                current_sign = classes[index]
+                await websocket.send_json({
+                    "sign": current_sign,
+                    "confidence": confidence,
+                    "frame": frame_index
+                })
+            frame_index += 1
+    
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
-        print(f"Prediction error: {e}")
-        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
\ No newline at end of file
+        print(f"Stream prediction error: {e}")
+        await websocket.close(code=1011)
+    finally:
+        motion_gate.forget_client(session_key)
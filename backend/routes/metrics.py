@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Response
+from models.model_cache import model_cache
+from models.motion_gate import motion_gate
+from utils.metrics import metrics, request_duration, request_timings, server_timing_header, SERVER_TIMING
+from utils.tracking_pool import tracking_pool
+import time
+
+router = APIRouter()
+
+CACHE_COUNTERS = ("hits", "misses", "evictions", "invalidations", "load_failures")
+
+metrics.callback(
+    "sign_model_cache_events", "Model cache lookups and removals by event",
+    lambda: {(event,): model_cache.stats()[event] for event in CACHE_COUNTERS},
+    kind="counter", labelnames=("event",)
+)
+metrics.callback("sign_model_cache_models", "Models held in the cache", lambda: model_cache.stats()["models"])
+metrics.callback("sign_model_cache_bytes", "Estimated bytes held by cached models", lambda: model_cache.stats()["bytes"])
+metrics.callback(
+    "sign_motion_gate_events", "Predictions served by the motion gate, its result cache, or inference",
+    lambda: {
+        ("motion_skip",): motion_gate.stats()["motion_skips"],
+        ("cache_hit",): motion_gate.stats()["cache_hits"],
+        ("inference",): motion_gate.stats()["inferences"],
+    },
+    kind="counter", labelnames=("outcome",)
+)
+metrics.callback("sign_tracking_queue_depth", "Hand tracking jobs waiting for a worker", lambda: tracking_pool.queue.qsize())
+metrics.callback(
+    "sign_tracking_rejected", "Hand tracking jobs rejected because the queue was full",
+    lambda: tracking_pool.rejected, kind="counter"
+)
+
+@router.get("/metrics")
+def get_metrics():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and, with SERVER_TIMING on,
+    returning the per-stage durations in a Server-Timing header."""
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {} if self.server_timing else None
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if timings is not None:
+                    timings["total"] = time.perf_counter() - start
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing_header(timings).encode("latin-1")))
+                    message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            request_duration.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status[0])
+            ).observe(time.perf_counter() - start)
+            request_timings.reset(token)
@@ -4,15 +4,28 @@ from pydantic import BaseModel
 from typing import List, Optional
 from database.database import get_db
 from database.models import Model as ModelDB
+from database.registry import model_registry
+from models.model_cache import model_cache, legacy_artifact_paths
+from models.artifacts import ArtifactError, list_versions, remove_model_artifacts, set_current, version_history
+from models.motion_gate import motion_gate
+from models.feature_cache import FeatureCache
+from models.preprocessing import DEFAULT_INPUT_PIPELINE, INPUT_PIPELINES
+from models.backends import DEFAULT_BACKEND, BACKENDS
 import json
 import os
 
 router = APIRouter()
 
+@router.on_event("startup")
+def load_model_registry():
+    model_registry.load()
+
 class ModelCreate(BaseModel):
     name: str
     type: str
     signs: Optional[List[str]] = None
+    input_pipeline: str = DEFAULT_INPUT_PIPELINE
+    backend: str = DEFAULT_BACKEND
 
 class ModelResponse(BaseModel):
     id: str
@@ -22,6 +35,8 @@ class ModelResponse(BaseModel):
     created_at: str
     is_trained: bool
     training_progress: int
+    input_pipeline: str
+    backend: str
 
 ARITHMETIC_SIGNS = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "+", "-", "x", "÷"]
 
@@ -34,17 +49,32 @@ def create_model(model_data: ModelCreate, db: Session = Depends(get_db)):
     else:
         raise HTTPException(status_code=400, detail="Signs are required for standard models")
     
+    if model_data.input_pipeline not in INPUT_PIPELINES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Input pipeline must be one of: {', '.join(INPUT_PIPELINES)}"
+        )
+    
+    if model_data.backend not in BACKENDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Backend must be one of: {', '.join(BACKENDS)}"
+        )
+    
     db_model = ModelDB(
         name=model_data.name,
         type=model_data.type,
         signs=json.dumps(signs),
         is_trained=False,
-        training_progress=0
+        training_progress=0,
+        input_pipeline=model_data.input_pipeline,
+        backend=model_data.backend
     )
     
     db.add(db_model)
     db.commit()
     db.refresh(db_model)
+    model_registry.set(db_model.id, False)
     
     return ModelResponse(
         id=db_model.id,
@@ -53,7 +83,9 @@ def create_model(model_data: ModelCreate, db: Session = Depends(get_db)):
         signs=json.loads(db_model.signs),
         created_at=db_model.created_at.isoformat(),
         is_trained=db_model.is_trained,
-        training_progress=db_model.training_progress
+        training_progress=db_model.training_progress,
+        input_pipeline=db_model.input_pipeline,
+        backend=db_model.backend
     )
 
 @router.get("/", response_model=List[ModelResponse])
@@ -68,7 +100,9 @@ def get_models(db: Session = Depends(get_db)):
             signs=json.loads(model.signs),
             created_at=model.created_at.isoformat(),
             is_trained=model.is_trained,
-            training_progress=model.training_progress
+            training_progress=model.training_progress,
+            input_pipeline=model.input_pipeline,
+            backend=model.backend
         )
         for model in models
     ]
@@ -86,7 +120,9 @@ def get_model(model_id: str, db: Session = Depends(get_db)):
         signs=json.loads(model.signs),
         created_at=model.created_at.isoformat(),
         is_trained=model.is_trained,
-        training_progress=model.training_progress
+        training_progress=model.training_progress,
+        input_pipeline=model.input_pipeline,
+        backend=model.backend
     )
 
 @router.delete("/{model_id}")
@@ -95,15 +131,43 @@ def delete_model(model_id: str, db: Session = Depends(get_db)):
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
     
-    model_path = f"storage/models/{model_id}.h5"
-    metadata_path = f"storage/models/{model_id}_metadata.json"
-    
-    if os.path.exists(model_path):
-        os.remove(model_path)
-    if os.path.exists(metadata_path):
-        os.remove(metadata_path)
+    remove_model_artifacts(model_id)
+    for path in legacy_artifact_paths(model_id).values():
+        if os.path.exists(path):
+            os.remove(path)
     
     db.delete(model)
     db.commit()
     
-    return {"message": "Model deleted successfully"}
\ No newline at end of file
+    model_registry.remove(model_id)
+    model_cache.invalidate(model_id)
+    motion_gate.invalidate(model_id)
+    FeatureCache(model_id).clear()
+    
+    return {"message": "Model deleted successfully"}
+
+@router.get("/{model_id}/versions")
+def get_model_versions(model_id: str, db: Session = Depends(get_db)):
+    if not db.query(ModelDB.id).filter(ModelDB.id == model_id).first():
+        raise HTTPException(status_code=404, detail="Model not found")
+    
+    return version_history(model_id)
+
+@router.post("/{model_id}/versions/{version}/activate")
+def activate_model_version(model_id: str, version: str, db: Session = Depends(get_db)):
+    if not db.query(ModelDB.id).filter(ModelDB.id == model_id).first():
+        raise HTTPException(status_code=404, detail="Model not found")
+    
+    if version not in list_versions(model_id):
+        raise HTTPException(status_code=404, detail=f"Unknown version {version}")
+    
+    # A corrupt version is refused rather than made current.
+    try:
+        set_current(model_id, version, verify=True)
+    except ArtifactError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    model_cache.invalidate(model_id)
+    motion_gate.invalidate(model_id)
+    
+    return {"message": f"Model {model_id} now serves {version}", "version": version}
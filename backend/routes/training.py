@@ -1,23 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List
-from database.database import get_db
-from database.models import Model as ModelDB, TrainingSample
-from models.training import ModelTrainer
+from typing import List, Optional
+from database.database import get_db, SessionLocal
+from database.models import Model as ModelDB, TrainingJob
+from database.samples import insert_training_samples, count_training_samples
+from database.registry import model_registry
+from models.model_cache import model_cache
+from models.motion_gate import motion_gate
+from jobs.scheduler import training_scheduler
+from utils.dataset_archive import export_dataset, import_dataset
 import json
+import os
+import tarfile
+import tempfile
 
 router = APIRouter()
 
+MAX_BULK_SAMPLES = int(os.environ.get("MAX_BULK_SAMPLES", "10000"))
+# Uploaded archives larger than this are spooled to disk before importing.
+DATASET_SPOOL_BYTES = 8 * 1024 * 1024
+DATASET_MAX_UPLOAD_BYTES = int(os.environ.get("DATASET_MAX_UPLOAD_BYTES", str(2 * 1024 * 1024 * 1024)))
+
 class TrainingData(BaseModel):
     sign: str
     landmarks: List[List[float]]
 
+class BulkTrainingData(BaseModel):
+    samples: List[TrainingData]
+
 class TrainingProgress(BaseModel):
     progress: int
     is_complete: bool
     message: str
 
+class TrainingJobResponse(BaseModel):
+    id: str
+    model_id: str
+    status: str
+    mode: str
+    error: Optional[str]
+    created_at: Optional[str]
+    started_at: Optional[str]
+    finished_at: Optional[str]
+
+def job_response(job: TrainingJob) -> TrainingJobResponse:
+    return TrainingJobResponse(
+        id=job.id,
+        model_id=job.model_id,
+        status=job.status,
+        mode=job.mode,
+        error=job.error,
+        created_at=job.created_at.isoformat() if job.created_at else None,
+        started_at=job.started_at.isoformat() if job.started_at else None,
+        finished_at=job.finished_at.isoformat() if job.finished_at else None
+    )
+
+@router.on_event("startup")
+def start_training_scheduler():
+    training_scheduler.add_listener(lambda model_id, status: model_cache.invalidate(model_id))
+    training_scheduler.add_listener(lambda model_id, status: motion_gate.invalidate(model_id))
+    training_scheduler.add_listener(lambda model_id, status: model_registry.refresh(model_id))
+    training_scheduler.start()
+
+@router.on_event("shutdown")
+def stop_training_scheduler():
+    training_scheduler.shutdown()
+
 @router.post("/{model_id}/sample")
 def add_training_sample(
     model_id: str,
@@ -28,57 +79,102 @@ def add_training_sample(
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
     
-    sample = TrainingSample(
-        model_id=model_id,
-        sign=training_data.sign,
-        landmarks=json.dumps(training_data.landmarks)
-    )
+    try:
+        _, progress = insert_training_samples(db, model, [(training_data.sign, training_data.landmarks)])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    db.add(sample)
-    db.commit()
+    return {"message": "Sample added successfully", "progress": progress}
+
+@router.post("/{model_id}/samples")
+def add_training_samples(
+    model_id: str,
+    bulk_data: BulkTrainingData,
+    db: Session = Depends(get_db)
+):
+    model = db.query(ModelDB).filter(ModelDB.id == model_id).first()
+    if not model:
+        raise HTTPException(status_code=404, detail="Model not found")
     
-    total_samples = db.query(TrainingSample).filter(TrainingSample.model_id == model_id).count()
-    signs = json.loads(model.signs)
-    required_samples = len(signs) * 10
-    progress = min(int((total_samples / required_samples) * 100), 100)
+    if len(bulk_data.samples) > MAX_BULK_SAMPLES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many samples. Maximum per request: {MAX_BULK_SAMPLES}"
+        )
     
-    model.training_progress = progress
-    db.commit()
+    try:
+        inserted, progress = insert_training_samples(
+            db, model, [(sample.sign, sample.landmarks) for sample in bulk_data.samples]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {"message": "Sample added successfully", "progress": progress}
+    return {"message": "Samples added successfully", "inserted": inserted, "progress": progress}
+
+def _archive_chunks(model_id: str):
+    # Runs while the response streams, after the request's session is closed.
+    db = SessionLocal()
+    try:
+        model = db.query(ModelDB).filter(ModelDB.id == model_id).first()
+        yield from export_dataset(db, model)
+    finally:
+        db.close()
+
+def _import_archive(model_id: str, fileobj):
+    db = SessionLocal()
+    try:
+        model = db.query(ModelDB).filter(ModelDB.id == model_id).first()
+        return import_dataset(db, model, fileobj, owner=training_scheduler.instance_id)
+    finally:
+        db.close()
 
-def train_model_background(model_id: str, db: Session):
+@router.get("/{model_id}/dataset")
+def export_training_dataset(model_id: str, db: Session = Depends(get_db)):
     model = db.query(ModelDB).filter(ModelDB.id == model_id).first()
     if not model:
-        return
+        raise HTTPException(status_code=404, detail="Model not found")
     
-    samples = db.query(TrainingSample).filter(TrainingSample.model_id == model_id).all()
+    return StreamingResponse(
+        _archive_chunks(model_id),
+        media_type="application/x-tar",
+        headers={"Content-Disposition": f'attachment; filename="{model_id}-dataset.tar"'}
+    )
+
+@router.post("/{model_id}/dataset")
+async def import_training_dataset(model_id: str, request: Request):
+    if model_registry.status(model_id) is None:
+        raise HTTPException(status_code=404, detail="Model not found")
     
-    trainer = ModelTrainer(model_id)
+    too_large = HTTPException(
+        status_code=413, detail=f"Archive too large. Maximum size: {DATASET_MAX_UPLOAD_BYTES} bytes"
+    )
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > DATASET_MAX_UPLOAD_BYTES:
+        raise too_large
     
-    for sample in samples:
-        landmarks = json.loads(sample.landmarks)
-        trainer.add_sample(landmarks, sample.sign)
+    with tempfile.SpooledTemporaryFile(max_size=DATASET_SPOOL_BYTES) as spool:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > DATASET_MAX_UPLOAD_BYTES:
+                raise too_large
+            spool.write(chunk)
+        spool.seek(0)
+        
+        try:
+            stats = await run_in_threadpool(_import_archive, model_id, spool)
+        except (ValueError, tarfile.TarError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid dataset archive: {e}")
     
-    try:
-        trainer.train_model()
-        model.is_trained = True
-        model.training_progress = 100
-        db.commit()
-    except Exception as e:
-        print(f"Training failed: {e}")
+    return {"message": "Dataset imported successfully", **stats}
 
 @router.post("/{model_id}/train")
-def train_model(
-    model_id: str,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
+def train_model(model_id: str, incremental: bool = False, db: Session = Depends(get_db)):
     model = db.query(ModelDB).filter(ModelDB.id == model_id).first()
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
     
-    samples_count = db.query(TrainingSample).filter(TrainingSample.model_id == model_id).count()
+    samples_count = count_training_samples(db, model_id)
     signs = json.loads(model.signs)
     required_samples = len(signs) * 10
     
@@ -88,9 +184,35 @@ def train_model(
             detail=f"Insufficient training samples. Required: {required_samples}, Available: {samples_count}"
         )
     
-    background_tasks.add_task(train_model_background, model_id, db)
+    mode = "incremental" if incremental and model.is_trained else "full"
+    job, created = training_scheduler.submit(db, model_id, mode)
     
-    return {"message": "Training started", "status": "in_progress"}
+    return {
+        "message": "Training started" if created else "Training already in progress",
+        "status": "in_progress",
+        "job_id": job.id
+    }
+
+@router.get("/{model_id}/jobs", response_model=List[TrainingJobResponse])
+def get_training_jobs(model_id: str, db: Session = Depends(get_db)):
+    jobs = db.query(TrainingJob).filter(TrainingJob.model_id == model_id).order_by(TrainingJob.created_at.desc()).all()
+    return [job_response(job) for job in jobs]
+
+@router.get("/jobs/{job_id}", response_model=TrainingJobResponse)
+def get_training_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    
+    return job_response(job)
+
+@router.post("/jobs/{job_id}/cancel", response_model=TrainingJobResponse)
+def cancel_training_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    
+    return job_response(training_scheduler.cancel(db, job))
 
 @router.get("/{model_id}/progress", response_model=TrainingProgress)
 def get_training_progress(model_id: str, db: Session = Depends(get_db)):
@@ -98,8 +220,16 @@ def get_training_progress(model_id: str, db: Session = Depends(get_db)):
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
     
+    message = "Training completed" if model.is_trained else "Training in progress"
+    
+    last_job = db.query(TrainingJob).filter(TrainingJob.model_id == model_id).order_by(TrainingJob.created_at.desc()).first()
+    if last_job is not None and last_job.status == "failed":
+        message = f"Training failed: {last_job.error}"
+    elif last_job is not None and last_job.status == "cancelled":
+        message = "Training cancelled"
+    
     return TrainingProgress(
         progress=model.training_progress,
         is_complete=model.is_trained,
-        message="Training completed" if model.is_trained else "Training in progress"
+        message=message
     )
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""Streaming export and import of a model's training samples.
+
+An archive is an uncompressed tar stream: manifest.json with the model's
+definition, then shards/NNNNN.npz holding a columnar block of samples:
+
+    landmarks   float32 (total_points, 3), every sample's points back to back
+    num_points  int32 (samples,)
+    label       int32 (samples,), index into classes
+    classes     str (signs,)
+
+Both directions work one shard at a time, so memory stays flat whatever the
+dataset size; imported samples only become visible once the whole archive
+has been read.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+import io
+import json
+import os
+import tarfile
+import time
+import zipfile
+import numpy as np
+
+ARCHIVE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+SHARD_SAMPLES = int(os.environ.get("DATASET_SHARD_SAMPLES", "20000"))
+# Shards are read whole; bigger members are rejected rather than buffered.
+MAX_SHARD_BYTES = int(os.environ.get("DATASET_MAX_SHARD_BYTES", str(256 * 1024 * 1024)))
+
+
+class _ChunkWriter:
+    """File-like sink that hands the bytes tarfile writes to a generator."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _add_member(archive, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    archive.addfile(info, io.BytesIO(data))
+
+
+def _encode_shard(points_blocks, count_blocks, signs) -> bytes:
+    classes = sorted(set(signs))
+    index = {sign: i for i, sign in enumerate(classes)}
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        landmarks=np.concatenate(points_blocks).astype("<f4", copy=False),
+        num_points=np.concatenate(count_blocks).astype(np.int32),
+        label=np.fromiter((index[sign] for sign in signs), dtype=np.int32, count=len(signs)),
+        classes=np.array(classes, dtype=str)
+    )
+    return buffer.getvalue()
+
+
+def export_dataset(db, model, shard_samples: int = SHARD_SAMPLES):
+    """Yield the archive of a model's samples as byte chunks.
+
+    Only samples present when the export starts are included, so samples
+    added meanwhile do not make the stream inconsistent.
+    """
+    from database.samples import dataset_state, iter_training_samples
+
+    max_seq, _ = dataset_state(db, model.id)
+    sink = _ChunkWriter()
+    archive = tarfile.open(fileobj=sink, mode="w|", format=tarfile.PAX_FORMAT)
+
+    manifest = {
+        "format": ARCHIVE_FORMAT,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "model": {
+            "id": model.id,
+            "name": model.name,
+            "type": model.type,
+            "signs": json.loads(model.signs),
+            "input_pipeline": model.input_pipeline,
+            "backend": model.backend,
+        },
+    }
+    _add_member(archive, MANIFEST_NAME, json.dumps(manifest, indent=2).encode())
+    yield sink.drain()
+
+    shard = 0
+    pending_points, pending_counts, pending_signs = [], [], []
+
+    def flush():
+        nonlocal shard
+        data = _encode_shard(pending_points, pending_counts, pending_signs)
+        _add_member(archive, f"shards/{shard:05d}.npz", data)
+        shard += 1
+        pending_points.clear()
+        pending_counts.clear()
+        pending_signs.clear()
+
+    for points, counts, signs in iter_training_samples(db, model.id, max_seq):
+        pending_points.append(points)
+        pending_counts.append(counts)
+        pending_signs.extend(signs)
+        if len(pending_signs) >= shard_samples:
+            flush()
+            yield sink.drain()
+
+    if pending_signs:
+        flush()
+    archive.close()
+    yield sink.drain()
+
+
+def _read_manifest(archive, member) -> dict:
+    if member is None or member.name != MANIFEST_NAME:
+        raise ValueError(f"Not a dataset archive: {MANIFEST_NAME} must come first")
+    manifest = json.loads(archive.extractfile(member).read())
+    if manifest.get("format") != ARCHIVE_FORMAT:
+        raise ValueError(f"Unsupported dataset archive format: {manifest.get('format')}")
+    return manifest
+
+
+def read_archive_manifest(fileobj) -> dict:
+    with tarfile.open(fileobj=fileobj, mode="r|") as archive:
+        return _read_manifest(archive, archive.next())
+
+
+def _decode_shard(name: str, data: bytes):
+    try:
+        with np.load(io.BytesIO(data), allow_pickle=False) as shard:
+            points = np.ascontiguousarray(shard["landmarks"], dtype="<f4")
+            counts = shard["num_points"].astype(np.int64)
+            labels = shard["label"].astype(np.int64)
+            classes = [str(sign) for sign in shard["classes"]]
+    except (OSError, KeyError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Corrupt shard {name}: {e}")
+
+    if points.ndim != 2 or points.shape[1] != 3:
+        raise ValueError("Shard landmarks must have shape (points, 3)")
+    if len(counts) != len(labels) or np.any(counts < 0) or int(counts.sum()) != len(points):
+        raise ValueError("Shard point counts do not match its landmarks")
+    if len(labels) and (labels.min() < 0 or labels.max() >= len(classes)):
+        raise ValueError("Shard labels out of range")
+    return points, counts, labels, classes
+
+
+def import_dataset(db, model, fileobj, owner: str = None):
+    """Bulk insert the samples of an archive into model.
+
+    Each shard is inserted in its own short transaction, but the samples stay
+    hidden until the last one is in and are deleted if the archive turns out
+    truncated or corrupt, so the model never ends up with part of it. Samples
+    of signs the model does not have are skipped, as with ingestion, and
+    reported in the returned stats.
+    """
+    from database.samples import begin_import, discard_import, publish_import, stage_encoded_samples
+
+    model_signs = set(json.loads(model.signs))
+    stats = {"shards": 0, "samples": 0, "skipped": 0}
+    skipped_signs = set()
+    sign_counts = Counter()
+    started = time.monotonic()
+
+    import_id = begin_import(db, model, owner)
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|") as archive:
+            _read_manifest(archive, archive.next())
+
+            for member in archive:
+                if not member.isfile() or not member.name.startswith("shards/"):
+                    continue
+                if member.size > MAX_SHARD_BYTES:
+                    raise ValueError(f"Shard {member.name} exceeds {MAX_SHARD_BYTES} bytes")
+
+                points, counts, labels, classes = _decode_shard(member.name, archive.extractfile(member).read())
+                ends = np.cumsum(counts)
+                blob = points.tobytes()
+
+                rows = []
+                for label, num_points, end in zip(labels.tolist(), counts.tolist(), ends.tolist()):
+                    sign = classes[label]
+                    if sign not in model_signs:
+                        skipped_signs.add(sign)
+                        stats["skipped"] += 1
+                        continue
+                    rows.append((sign, blob[(end - num_points) * 12:end * 12], num_points))
+
+                if rows:
+                    sign_counts.update(stage_encoded_samples(db, model, import_id, rows))
+                stats["shards"] += 1
+
+        publish_import(db, model, import_id, sign_counts)
+    except BaseException:
+        db.rollback()
+        discard_import(db, import_id)
+        raise
+
+    stats["samples"] = sum(sign_counts.values())
+    stats["skipped_signs"] = sorted(skipped_signs)
+    stats["seconds"] = time.monotonic() - started
+    return stats
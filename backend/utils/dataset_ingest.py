@@ -0,0 +1,273 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+IMAGE_CHUNK_SIZE = 64
+SEGMENT_FRAMES = 900
+INSERT_BATCH_SIZE = 2000
+REPORT_INTERVAL = 5.0
+
+
+class IngestTask:
+    def __init__(self, sign: str, kind: str, paths, keys, start: int = 0, stop: int = None):
+        self.sign = sign
+        self.kind = kind
+        self.paths = paths
+        self.keys = keys
+        self.start = start
+        self.stop = stop
+
+
+def _video_frame_count(path: str) -> int:
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    try:
+        return int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) if capture.isOpened() else 0
+    finally:
+        capture.release()
+
+
+def discover_tasks(root: str, signs, done=frozenset(), segment_frames: int = SEGMENT_FRAMES,
+                   image_chunk_size: int = IMAGE_CHUNK_SIZE):
+    """Build ingestion tasks from a directory with one sub-folder per sign.
+
+    Long videos are cut into segments of segment_frames so a few large files
+    still spread over all workers; images are grouped into chunks to keep the
+    per-task overhead low. Keys already present in done are left out.
+    """
+    tasks = []
+    skipped_signs = []
+
+    for sign in sorted(os.listdir(root)):
+        sign_dir = os.path.join(root, sign)
+        if not os.path.isdir(sign_dir):
+            continue
+        if sign not in signs:
+            skipped_signs.append(sign)
+            continue
+
+        images = []
+        for dirpath, _, filenames in os.walk(sign_dir):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, root)
+                extension = os.path.splitext(filename)[1].lower()
+
+                if extension in IMAGE_EXTENSIONS:
+                    if key not in done:
+                        images.append((path, key))
+                elif extension in VIDEO_EXTENSIONS:
+                    frame_count = _video_frame_count(path)
+                    step = segment_frames if segment_frames > 0 and frame_count > 0 else max(frame_count, 1)
+                    for start in range(0, max(frame_count, 1), step):
+                        stop = start + step if frame_count > 0 else None
+                        segment_key = f"{key}#{start}"
+                        if segment_key not in done:
+                            tasks.append(IngestTask(sign, "video", [path], [segment_key], start, stop))
+
+        for offset in range(0, len(images), image_chunk_size):
+            chunk = images[offset:offset + image_chunk_size]
+            tasks.append(IngestTask(
+                sign, "images", [path for path, _ in chunk], [key for _, key in chunk]
+            ))
+
+    return tasks, skipped_signs
+
+
+_processors = {}
+
+
+def init_ingest_worker():
+    import cv2
+
+    # Parallelism comes from the process pool; OpenCV's own thread pool
+    # would only oversubscribe the cores.
+    cv2.setNumThreads(1)
+
+
+def _processor(static_image_mode: bool):
+    processor = _processors.get(static_image_mode)
+    if processor is None:
+        from .mediapipe_processor import MediaPipeProcessor
+        processor = MediaPipeProcessor(static_image_mode=static_image_mode)
+        _processors[static_image_mode] = processor
+    return processor
+
+
+def _pack(landmark_sets):
+    counts = np.array([len(landmarks) for landmarks in landmark_sets], dtype=np.int64)
+    points = np.asarray(
+        [point for landmarks in landmark_sets for point in landmarks], dtype=np.float32
+    ).reshape(-1, 3)
+    return points, counts
+
+
+def process_task(task: IngestTask, frame_step: int = 1):
+    """Run hand tracking for one task; returns packed landmarks of frames with hands."""
+    import cv2
+    from .tracking_pool import decode_image
+
+    landmark_sets = []
+    frames_read = 0
+
+    if task.kind == "images":
+        processor = _processor(True)
+        for path in task.paths:
+            try:
+                with open(path, 'rb') as f:
+                    frame = decode_image(f.read())
+            except (OSError, ValueError):
+                continue
+            frames_read += 1
+            landmarks, _ = processor.process_rgb(frame)
+            if landmarks:
+                landmark_sets.append(landmarks)
+    else:
+        # Tracking state from the previous file or segment must not leak in.
+        processor = _processor(False)
+        processor.reset()
+        capture = cv2.VideoCapture(task.paths[0])
+        if task.start > 0:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, task.start)
+
+        frame = None
+        position = task.start
+        try:
+            while task.stop is None or position < task.stop:
+                # Skipped frames are only grabbed, not decoded.
+                if (position - task.start) % frame_step != 0:
+                    if not capture.grab():
+                        break
+                    position += 1
+                    continue
+
+                ok, frame = capture.read(frame)
+                if not ok:
+                    break
+                position += 1
+                frames_read += 1
+
+                landmarks, _ = processor.process_frame(frame)
+                if landmarks:
+                    landmark_sets.append(landmarks)
+        finally:
+            capture.release()
+
+    points, counts = _pack(landmark_sets)
+    return points, counts, frames_read
+
+
+def load_manifest(path: str):
+    done = set()
+    if not os.path.exists(path):
+        return done
+
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                done.update(json.loads(line)["keys"])
+    return done
+
+
+def run_ingest(db, model, root: str, manifest_path: str, workers: int = None, frame_step: int = 1,
+               segment_frames: int = SEGMENT_FRAMES, batch_size: int = INSERT_BATCH_SIZE,
+               report_interval: float = REPORT_INTERVAL, log=print):
+    """Extract landmarks for a labelled media directory and insert them as training samples.
+
+    Finished tasks are appended to a JSON-lines manifest right after their
+    samples are committed, so an interrupted run picks up where it stopped.
+    """
+    from database.samples import insert_training_samples
+
+    workers = workers or os.cpu_count() or 1
+    frame_step = max(1, frame_step)
+    done = load_manifest(manifest_path)
+    tasks, skipped_signs = discover_tasks(root, set(json.loads(model.signs)), done, segment_frames)
+
+    for sign in skipped_signs:
+        log(f"Skipping folder '{sign}': not a sign of this model")
+    log(f"{len(tasks)} tasks to process ({len(done)} already ingested) with {workers} workers")
+
+    stats = {"tasks": 0, "frames": 0, "samples": 0}
+    pending_samples = []
+    pending_keys = []
+    started = time.monotonic()
+    last_report = started
+
+    def flush():
+        if pending_samples:
+            inserted, _ = insert_training_samples(db, model, pending_samples)
+            stats["samples"] += inserted
+        if pending_keys:
+            with open(manifest_path, 'a') as f:
+                f.write(json.dumps({"keys": pending_keys}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        pending_samples.clear()
+        pending_keys.clear()
+
+    def report():
+        elapsed = max(time.monotonic() - started, 1e-9)
+        log(
+            f"{stats['tasks']}/{len(tasks)} tasks, {stats['frames']} frames "
+            f"({stats['frames'] / elapsed:.1f} fps), {stats['samples']} samples inserted"
+        )
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_ingest_worker
+    )
+    try:
+        queued = iter(tasks)
+        running = {}
+
+        def fill():
+            # Bounded in-flight work keeps memory flat regardless of dataset size.
+            while len(running) < workers * 2:
+                task = next(queued, None)
+                if task is None:
+                    return
+                running[executor.submit(process_task, task, frame_step)] = task
+
+        fill()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                task = running.pop(future)
+                try:
+                    points, counts, frames_read = future.result()
+                except Exception as e:
+                    log(f"Failed to process {task.keys[0]}: {e}")
+                    continue
+
+                offsets = np.concatenate([[0], np.cumsum(counts)])
+                pending_samples.extend(
+                    (task.sign, points[offsets[i]:offsets[i + 1]]) for i in range(len(counts))
+                )
+                pending_keys.extend(task.keys)
+                stats["tasks"] += 1
+                stats["frames"] += frames_read
+
+            if len(pending_samples) >= batch_size:
+                flush()
+            fill()
+
+            if time.monotonic() - last_report >= report_interval:
+                last_report = time.monotonic()
+                report()
+
+        flush()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    report()
+    stats["seconds"] = time.monotonic() - started
+    return stats
@@ -3,18 +3,39 @@ import cv2
 import numpy as np
 
 class MediaPipeProcessor:
-    def __init__(self):
+    def __init__(self, static_image_mode: bool = False):
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
+        self.static_image_mode = static_image_mode
+        self.hands = self._create_hands()
+        self.mp_draw = mp.solutions.drawing_utils
+        self._rgb_buffer = None
+    
+    def _create_hands(self):
+        return self.mp_hands.Hands(
+            static_image_mode=self.static_image_mode,
             max_num_hands=2,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
-        self.mp_draw = mp.solutions.drawing_utils
+    
+    def reset(self):
+        """Forget the hands tracked so far, so the next frame starts a new video."""
+        if hasattr(self.hands, "reset"):
+            self.hands.reset()
+        else:
+            self.hands.close()
+            self.hands = self._create_hands()
     
     def process_frame(self, frame):
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # The RGB copy goes into a buffer that is reused while the frame size
+        # stays the same, instead of a new allocation per frame.
+        if self._rgb_buffer is None or self._rgb_buffer.shape != frame.shape:
+            self._rgb_buffer = np.empty(frame.shape, dtype=np.uint8)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
+        return self.process_rgb(rgb_frame)
+    
+    def process_rgb(self, rgb_frame):
+        """Like process_frame, for frames that are already RGB."""
         results = self.hands.process(rgb_frame)
         
         landmarks = []
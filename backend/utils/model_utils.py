@@ -38,43 +38,21 @@ def augment_landmarks(landmarks: List[List[float]], num_augmentations: int = 3)
     return augmented_samples
 
 def calculate_hand_features(landmarks: List[List[float]]) -> List[float]:
-    if not validate_landmarks(landmarks):
-        return [0.0] * 20
-    
-    landmarks_array = np.array(landmarks)
-    features = []
-    
-    if len(landmarks_array) >= 21:
-        hand = landmarks_array[:21]
-        
-        distances = []
-        for i in range(1, 21):
-            dist = np.linalg.norm(hand[i] - hand[0])
-            distances.append(dist)
-        
-        angles = []
-        for i in range(1, 20):
-            v1 = hand[i] - hand[0]
-            v2 = hand[i+1] - hand[0]
-            cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2) + 1e-8)
-            angles.append(np.arccos(np.clip(cos_angle, -1, 1)))
-        
-        features.extend(distances[:10])
-        features.extend(angles[:10])
-    
-    while len(features) < 20:
-        features.append(0.0)
+    from models.hand_features import HAND_FEATURE_DIM, hand_features_packed
     
-    return features[:20]
-
-def save_model_metadata(model_id: str, metadata: dict):
-    os.makedirs("storage/models", exist_ok=True)
-    metadata_path = f"storage/models/{model_id}_metadata.json"
+    if not validate_landmarks(landmarks):
+        return [0.0] * HAND_FEATURE_DIM
     
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    points = np.asarray(landmarks, dtype=np.float64)
+    return hand_features_packed(points, [len(points)])[0].tolist()
 
 def load_model_metadata(model_id: str) -> dict:
+    from models.artifacts import read_manifest
+    
+    manifest = read_manifest(model_id)
+    if manifest is not None:
+        return manifest["metadata"]
+    
     metadata_path = f"storage/models/{model_id}_metadata.json"
     
     if not os.path.exists(metadata_path):
@@ -0,0 +1,48 @@
+from collections import deque
+import numpy as np
+
+SMOOTHING_MODES = ("none", "majority", "ema")
+
+
+class TemporalSmoother:
+    def __init__(self, num_classes: int, mode: str = "majority", window: int = 5, alpha: float = 0.4):
+        if mode not in SMOOTHING_MODES:
+            raise ValueError(f"Unknown smoothing mode: {mode}")
+        if window < 1:
+            raise ValueError("Smoothing window must be at least 1")
+        if not 0 < alpha <= 1:
+            raise ValueError("Smoothing alpha must be in (0, 1]")
+
+        self.num_classes = num_classes
+        self.mode = mode
+        self.alpha = alpha
+        self.history = deque(maxlen=window)
+        self.average = None
+
+    def update(self, probabilities):
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+
+        if self.mode == "ema":
+            if self.average is None:
+                self.average = probabilities.copy()
+            else:
+                self.average += self.alpha * (probabilities - self.average)
+            index = int(np.argmax(self.average))
+            return index, float(self.average[index])
+
+        if self.mode == "majority":
+            self.history.append(probabilities)
+            window = np.array(self.history)
+            votes = np.bincount(np.argmax(window, axis=1), minlength=self.num_classes)
+            # Ties go to the class with the highest mean probability in the window.
+            mean = window.mean(axis=0)
+            candidates = np.flatnonzero(votes == votes.max())
+            index = int(candidates[np.argmax(mean[candidates])])
+            return index, float(mean[index])
+
+        index = int(np.argmax(probabilities))
+        return index, float(probabilities[index])
+
+    def reset(self):
+        self.history.clear()
+        self.average = None
@@ -0,0 +1,162 @@
+from concurrent.futures import Future
+import numpy as np
+import os
+import queue
+import tempfile
+import threading
+
+TRACKING_WORKERS = int(os.environ.get("TRACKING_WORKERS", str(os.cpu_count() or 1)))
+TRACKING_QUEUE_SIZE = int(os.environ.get("TRACKING_QUEUE_SIZE", str(TRACKING_WORKERS * 4)))
+MAX_CLIP_FRAMES = int(os.environ.get("MAX_CLIP_FRAMES", "300"))
+
+
+class TrackingPoolBusy(Exception):
+    pass
+
+
+def decode_image(data: bytes):
+    """Decode an encoded image into an RGB frame for MediaPipe.
+
+    OpenCV's Python imdecode cannot decode into a caller's buffer, so each
+    image gets one new array; decoding straight to RGB makes it the only one,
+    with no BGR copy and no conversion pass. Older OpenCV converts in place.
+    """
+    import cv2
+
+    rgb_flag = getattr(cv2, "IMREAD_COLOR_RGB", None)
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    frame = cv2.imdecode(buffer, rgb_flag if rgb_flag is not None else cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Could not decode image")
+    if rgb_flag is None:
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+    return frame
+
+
+class _TrackingWorker:
+    """Per-thread MediaPipe state.
+
+    Still images go through a static-image Hands instance; clips use a tracking
+    instance so consecutive frames skip palm detection. Both are created on
+    first use, since building a Hands graph is expensive. A worker runs one job
+    at a time, and the tracking instance is reset before each clip so no state
+    carries over from another upload.
+    """
+
+    def __init__(self, processor_factory):
+        self.processor_factory = processor_factory
+        self.image_processor = None
+        self.clip_processor = None
+        self.frame_buffer = None
+
+    def process_image(self, data: bytes):
+        if self.image_processor is None:
+            self.image_processor = self.processor_factory(True)
+        landmarks, _ = self.image_processor.process_rgb(decode_image(data))
+        return landmarks
+
+    def process_clip(self, data: bytes, suffix: str, max_frames: int):
+        import cv2
+
+        if self.clip_processor is None:
+            self.clip_processor = self.processor_factory(False)
+        else:
+            self.clip_processor.reset()
+
+        # VideoCapture only reads from files, so the clip is spooled to disk.
+        with tempfile.NamedTemporaryFile(suffix=suffix) as clip_file:
+            clip_file.write(data)
+            clip_file.flush()
+
+            capture = cv2.VideoCapture(clip_file.name)
+            if not capture.isOpened():
+                raise ValueError("Could not decode video clip")
+
+            frames = []
+            try:
+                while len(frames) < max_frames:
+                    ok, frame = capture.read(self.frame_buffer)
+                    if not ok:
+                        break
+                    self.frame_buffer = frame
+                    landmarks, _ = self.clip_processor.process_frame(frame)
+                    frames.append(landmarks)
+            finally:
+                capture.release()
+
+        if not frames:
+            raise ValueError("Video clip contains no frames")
+        return frames
+
+
+def _default_processor(static_image_mode: bool):
+    from .mediapipe_processor import MediaPipeProcessor
+    return MediaPipeProcessor(static_image_mode=static_image_mode)
+
+
+class HandTrackingPool:
+    """Fixed set of threads, each owning its own MediaPipe Hands instances.
+
+    Jobs wait in a bounded queue; when it is full, submit raises
+    TrackingPoolBusy so the caller can shed load instead of queueing
+    unbounded work.
+    """
+
+    def __init__(self, workers: int = TRACKING_WORKERS, queue_size: int = TRACKING_QUEUE_SIZE,
+                 processor_factory=_default_processor):
+        self.workers = max(1, workers)
+        self.processor_factory = processor_factory
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self._threads = []
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"hand-tracking-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        worker = _TrackingWorker(self.processor_factory)
+        while True:
+            method, args, future = self.queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(getattr(worker, method)(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _submit(self, method: str, *args) -> Future:
+        if not self._threads:
+            self._start()
+
+        future = Future()
+        try:
+            self.queue.put_nowait((method, args, future))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise TrackingPoolBusy("Hand tracking queue is full")
+        return future
+
+    def submit_image(self, data: bytes) -> Future:
+        return self._submit("process_image", data)
+
+    def submit_clip(self, data: bytes, suffix: str = ".mp4", max_frames: int = MAX_CLIP_FRAMES) -> Future:
+        return self._submit("process_clip", data, suffix, max_frames)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "rejected": self.rejected,
+        }
+
+
+tracking_pool = HandTrackingPool()
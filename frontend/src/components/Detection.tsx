@@ -16,6 +16,7 @@ const Detection: React.FC = () => {
   const [loading, setLoading] = useState(true);
   const [detectionError, setDetectionError] = useState<string | null>(null);
   const [lastPredictionTime, setLastPredictionTime] = useState<number>(0);
+  const streamRef = useRef<WebSocket | null>(null);
 
   // Refs y hook de cámara
   const videoRef = useRef<HTMLVideoElement>(null);
@@ -43,11 +44,37 @@ const Detection: React.FC = () => {
     }
   };
 
+  // Sesión de streaming: el servidor suaviza las predicciones y solo envía cambios de seña
+  useEffect(() => {
+    if (!model || !isDetecting) return;
+
+    const socket = detectionApi.openStream(model.id);
+    socket.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+      if (data.error) {
+        console.error('Error during streaming prediction:', data.error);
+        setDetectionError('Error al realizar la predicción');
+        return;
+      }
+      setDetectionError(null);
+      setPrediction({ sign: data.sign, confidence: data.confidence });
+    };
+    streamRef.current = socket;
+
+    return () => {
+      socket.close();
+      streamRef.current = null;
+    };
+  }, [model, isDetecting]);
+
   const handleDetection = useCallback(async (landmarksCaptured: number[][]) => {
     if (!model || !isDetecting || landmarksCaptured.length === 0) return;
 
+    const stream = streamRef.current;
+    const isStreaming = stream !== null && stream.readyState === WebSocket.OPEN;
+
     const now = Date.now();
-    if (now - lastPredictionTime < 200) return;
+    if (now - lastPredictionTime < (isStreaming ? 100 : 200)) return;
 
     try {
       setDetectionError(null);
@@ -57,6 +84,12 @@ const Detection: React.FC = () => {
         return;
       }
 
+      if (isStreaming) {
+        stream.send(JSON.stringify({ landmarks: landmarksCaptured }));
+        setLastPredictionTime(now);
+        return;
+      }
+
       const response = await detectionApi.predict(model.id, landmarksCaptured);
       setPrediction(response.data);
       setLastPredictionTime(now);
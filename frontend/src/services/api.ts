@@ -18,6 +18,8 @@ export const modelApi = {
 export const trainingApi = {
   addSample: (modelId: string, data: TrainingData) => 
     api.post(`/training/${modelId}/sample`, data),
+  addSamples: (modelId: string, samples: TrainingData[]) =>
+    api.post(`/training/${modelId}/samples`, { samples }),
   train: (modelId: string) => api.post(`/training/${modelId}/train`),
   getProgress: (modelId: string) => api.get(`/training/${modelId}/progress`),
 };
@@ -25,4 +27,17 @@ export const trainingApi = {
 export const detectionApi = {
   predict: (modelId: string, landmarks: number[][]) => 
     api.post<PredictionResult>(`/detection/${modelId}/predict`, { landmarks }),
+  predictBatch: (modelId: string, frames: Float32Array, points: number) =>
+    api.post<{ predictions: PredictionResult[] }>(`/detection/${modelId}/predict/batch`, frames.buffer, {
+      params: { points },
+      headers: { 'Content-Type': 'application/octet-stream' },
+    }),
+  predictImage: (modelId: string, image: Blob) =>
+    api.post<PredictionResult & { hands: number }>(`/detection/${modelId}/predict/image`, image, {
+      headers: { 'Content-Type': image.type || 'image/jpeg' },
+    }),
+  openStream: (modelId: string, smoothing: 'none' | 'majority' | 'ema' = 'majority') => {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    return new WebSocket(`${protocol}://${window.location.host}${API_BASE_URL}/detection/${modelId}/stream?smoothing=${smoothing}`);
+  },
 };
\ No newline at end of file
@@ -6,6 +6,8 @@ export interface Model {
   created_at: string;
   is_trained: boolean;
   training_progress?: number;
+  input_pipeline?: 'landmarks' | 'hand_features';
+  backend?: 'mlp' | 'logistic' | 'knn' | 'auto';
 }
 
 export interface TrainingData {